@@ -1,16 +1,13 @@
 import streamlit as st
-import pandas as pd
 import os
-import requests
 import common as cm
-from PIL import Image
-from io import BytesIO
+import image_store
+import search_index
 import logging
 from Do_Test.define_metadata import main_define_metadata
 from Do_Test.do_test import main_do_test
 from Do_Test.result_page import main_result_page
-from Do_Test.gen_audio import create_full_audio
-from Do_Test.gen_audio import regen_full_audio
+from Do_Test.audio_jobs import submit_audio_job, get_job_status, show_job_progress, ACTIVE_STATES
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -19,69 +16,39 @@ logger = logging.getLogger(__name__)
 # Constants for file paths
 IMAGE_SIZE = 80  # Set this to the desired thumbnail size (e.g., 60 pixels)
 
-@st.cache_data
-def fetch_and_resize_image(url, size):
-    """Fetch an image from a URL and resize it to the given size."""
-    try:
-        response = requests.get(url, timeout=5)
-        img = Image.open(BytesIO(response.content))
-        img.thumbnail((size, size))
-        return img
-    except requests.RequestException as e:
-        logger.error(f"Error fetching image from {url}: {e}")
-        return Image.open(cm.PLACEHOLDER_IMAGE).resize((size, size))
-    except Exception as e:
-        logger.error(f"Error processing image from {url}: {e}")
-        return Image.open(cm.PLACEHOLDER_IMAGE).resize((size, size))
-
-def get_filtered_words(test_id):
-    """Read and filter the WordsList.csv file based on the TestID."""
-    try:
-        df_words = cm.read_csv_file(cm.WORDS_CSV_FILE_PATH, cm.prd_WordsList_path)
-        filtered_words = df_words[df_words['TestID'] == int(test_id)]
-        return filtered_words  # Return the filtered DataFrame
-    except Exception as e:
-        st.error(f"Error filtering WordsList.csv: {e}")
-        return pd.DataFrame()
-
 @st.dialog("Create Audio File")
 def show_dialog(test_name, test_id):
     st.write(f"Test {test_name} did not have Audio File yet.")
-    st.write(f"Do you want to create the Audio?")
+    job = get_job_status(test_id)
+    if job is None or job['state'] not in ACTIVE_STATES:
+        st.write(f"Do you want to create the Audio?")
+    submitted = False
     col1, col2 = st.columns([1,1])
     with col1:
         if st.button("Back"):
             st.rerun()
     with col2:
         if st.button("Create Audio"):
-            st.write(f"Creating audio for {test_id}-{test_name}")           
-            # read csv Filter df
-            df = get_filtered_words(test_id)
+            st.write(f"Creating audio for {test_id}-{test_name}")
+            # The audio is built in the background; this dialog only polls its progress
+            submit_audio_job(test_id, 'create')
+            submitted = True
+    if submitted or (job is not None and job['state'] in ACTIVE_STATES):
+        show_job_progress(test_id)
 
-            # Create Audio folder in prd environment if it does not exist
-            if not os.path.exists(cm.prd_Audio_path):
-                os.makedirs(cm.prd_Audio_path)
-            if not os.path.exists(cm.prd_Temp_path):
-                os.makedirs(cm.prd_Temp_path)
-            else:
-                # If the folder exists, clear it
-                cm.clear_files_in_folder(cm.prd_Temp_path)
-            audio_name = f"TestID_{test_id}"
-            # create and save audio
-            with st.spinner('Please wait...'):
-                create_full_audio(audio_name, df, cm.prd_Audio_path)
-            st.success(f"Audio for {test_id}-{test_name} is created successfully")
-    
 
 def show_test_list(df):
     st.write("### Select your test")
+    df = cm.paginate(df, "test_list")  # Only the rows of the current page are built
+
+    # Download the page's thumbnails at once; the rows below then render from the cache
+    image_store.prefetch(image_store.load_thumbnail, [(image_url, IMAGE_SIZE) for image_url in df["Image"]])
 
     for index, row in df.iterrows():
         cols = st.columns([1.2, 1.5, 1.5, 1, 1])  # Adjust column widths
 
-        # Check if the image URL is valid; if not, use the placeholder image
-        image_url = row["Image"]
-        img = fetch_and_resize_image(image_url if image_url else cm.PLACEHOLDER_IMAGE, IMAGE_SIZE)
+        # The thumbnail store falls back to the placeholder image for invalid URLs
+        img = image_store.load_thumbnail(row["Image"], IMAGE_SIZE)
 
         # Display row data with improved layout
         cols[0].image(img)
@@ -118,8 +85,22 @@ def main_show_test_list():
     #"""Page routing logic."""
     if st.session_state.page == 'test_list':
         st.title("Test List")
-        # Load and display the test list
-        df = cm.read_csv_file(cm.TESTS_CSV_FILE_PATH, cm.prd_TestsList_path)
+        query = st.text_input(
+            "Search", placeholder="Search tests and words", key="test_search",
+            on_change=lambda: st.session_state.pop("test_list_page", None),  # Start from the first page
+        )
+        if query.strip():
+            # Tests matching the query, or containing a word that matches it
+            df, words = search_index.search_catalog(query)
+            if not words.empty:
+                with st.expander(f"{len(words)} matching words"):
+                    st.dataframe(words[['TestID', 'Word', 'Description']], hide_index=True)
+            if df.empty:
+                st.write("No tests match your search.")
+                return
+        else:
+            # Load and display the test list
+            df = cm.read_csv_file(cm.TESTS_CSV_FILE_PATH, cm.prd_TestsList_path)
         if not df.empty:
             show_test_list(df)
         else:
@@ -131,4 +112,6 @@ def main_show_test_list():
     elif st.session_state.page == 'result_page':
             main_result_page()        
 
-main_show_test_list()
+if __name__ == "__main__":
+    main_show_test_list()
+
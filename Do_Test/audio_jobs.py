@@ -0,0 +1,110 @@
+#audio_jobs.py
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+import common as cm
+from Do_Test.gen_audio import create_full_audio, regen_full_audio
+
+logger = logging.getLogger(__name__)
+
+# Process-wide queue of full-test audio builds, so pages never block on them.
+# There is at most one active job per TestID: submitting a test that is already queued or
+# running returns the existing job. Job status is kept in memory and persisted to
+# prd_Data/prd_AudioJobs/TestID_<id>.json, so it survives page reloads and restarts.
+
+ACTIVE_STATES = ('queued', 'running')
+
+_jobs = {}  # TestID -> job status dict
+_jobs_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=cm.AUDIO_JOB_WORKERS, thread_name_prefix="audio_job")
+
+def _status_path(test_id):
+    return os.path.join(cm.prd_AudioJobs_path, f"TestID_{test_id}.json")
+
+def _persist(job):
+    cm.write_atomic(_status_path(job['test_id']), json.dumps(job))
+
+def _update(test_id, persist=True, **changes):
+    with _jobs_lock:
+        job = _jobs[test_id]
+        job.update(changes)
+        job = dict(job)
+    if persist:
+        _persist(job)
+
+def _run(test_id, kind):
+    _update(test_id, state='running', started_at=time.time())
+    last_saved = [0.0]
+
+    def progress(done, total):
+        now = time.time()
+        persist = now - last_saved[0] >= 1  # Persist progress at most once a second
+        if persist:
+            last_saved[0] = now
+        _update(test_id, persist=persist, progress=done / total if total else 1.0)
+
+    try:
+        os.makedirs(cm.prd_Audio_path, exist_ok=True)
+        df = cm.get_filtered_words(test_id)
+        audio_name = f"TestID_{test_id}"
+        if kind == 'regen':
+            regen_full_audio(audio_name, df, cm.prd_Audio_path, progress=progress)
+        else:
+            create_full_audio(audio_name, df, cm.prd_Audio_path, progress=progress)
+        _update(test_id, state='done', progress=1.0, finished_at=time.time())
+    except Exception as e:
+        logger.exception(f"Audio job for TestID {test_id} failed")
+        _update(test_id, state='failed', error=str(e), finished_at=time.time())
+
+def submit_audio_job(test_id, kind='create'):
+    """Queue building the audio of a test ('create', or 'regen' to rebuild it) and return its status."""
+    test_id = int(test_id)
+    with _jobs_lock:
+        job = _jobs.get(test_id)
+        if job is not None and job['state'] in ACTIVE_STATES:
+            return dict(job)  # The same test is already being built
+        job = {'test_id': test_id, 'kind': kind, 'state': 'queued', 'progress': 0.0,
+               'error': None, 'submitted_at': time.time(), 'started_at': None, 'finished_at': None}
+        _jobs[test_id] = job
+    _persist(job)
+    _pool.submit(_run, test_id, kind)
+    return dict(job)
+
+def get_job_status(test_id):
+    """Return the status of the latest audio job of a test, or None if it never had one."""
+    test_id = int(test_id)
+    with _jobs_lock:
+        job = _jobs.get(test_id)
+        if job is not None:
+            return dict(job)
+    try:
+        with open(_status_path(test_id), 'r', encoding='utf-8') as f:
+            job = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if job['state'] in ACTIVE_STATES:
+        # Persisted by a process that has since stopped
+        job.update(state='failed', error="Interrupted by a restart")
+    return job
+
+@st.fragment(run_every=cm.AUDIO_JOB_POLL_SECONDS)
+def show_job_progress(test_id, rerun_when_finished=False):
+    """Show the progress of a test's audio job, refreshing itself until the job finishes."""
+    job = get_job_status(test_id)
+    if job is None:
+        return
+    if job['state'] == 'queued':
+        st.progress(0.0, text="Waiting for other audio builds...")
+    elif job['state'] == 'running':
+        st.progress(job['progress'], text=f"Creating audio... {job['progress']:.0%}")
+    elif rerun_when_finished:
+        st.rerun()
+    elif job['state'] == 'done':
+        st.success(f"Audio for TestID {test_id} is created successfully")
+    else:
+        st.error(f"Creating audio for TestID {test_id} failed: {job['error']}")
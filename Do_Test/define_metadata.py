@@ -1,12 +1,8 @@
 import streamlit as st
 import pandas as pd
-import requests
-from PIL import Image
-from io import BytesIO
 import logging
 import time
-import os
-from streamlit_js_eval import streamlit_js_eval
+import common as cm
 #from Do_Test.do_test import main_do_test
 
 # Setup logging
@@ -27,37 +23,13 @@ prd_ClassData_path = 'prd_Data/prd_ClassData.csv'
 prd_AttemptData_path = 'prd_Data/prd_AttemptData.csv'
 prd_TestsList_path = 'prd_Data/prd_TestsListData.csv'
 
-def read_csv_file(repo_path, prd_path):
-    """Read data from a CSV file."""
-    try:
-        #df = pd.read_csv(filename)
-        #logger.info(f"Successfully loaded data from {filename}")
-        
-        if os.path.exists(prd_path):
-            df = pd.read_csv(prd_path)
-            #st.info("Data loaded from local storage.")
-        else:
-            # Initial load from a repository, as a fallback (if needed)
-            df = pd.read_csv(repo_path)  # Replace with your default CSV
-            df.to_csv(prd_path, index=False)  # Save to local environment
-            #st.info("Data loaded from repository and saved to local storage.")
-        return df
-    except (FileNotFoundError, pd.errors.EmptyDataError, pd.errors.ParserError) as e:
-        st.error(f"Error loading file: {repo_path} - {str(e)}")
-        logger.error(f"Error loading file: {repo_path} - {str(e)}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Unexpected error: {e}")
-        logger.exception(f"Unexpected error occurred while reading the CSV file.")
-        return pd.DataFrame()
-
 def get_new_id(df, column_name):
     """Generate a new ID for a given DataFrame column."""
     return 1 if df.empty else df[column_name].max() + 1
 
-def save_to_csv(df, filepath, success_message):
-    """Save a DataFrame to a CSV file and display a success message."""
-    df.to_csv(filepath, index=False)
+def save_to_csv(new_df, filepath, success_message):
+    """Append new rows to a CSV file and display a success message."""
+    cm.get_storage().insert_rows(new_df, filepath)
     st.success(success_message)
 
 def main_define_metadata():
@@ -76,10 +48,10 @@ def main_define_metadata():
     st.title("Pre-Test")
 
     # Load CSV data
-    df_test = read_csv_file(TESTS_CSV_FILE_PATH, prd_TestsList_path)
-    df_user = read_csv_file(USERDATA_CSV_FILE_PATH, prd_UserData_path)
-    df_class = read_csv_file(CLASSDATA_CSV_FILE_PATH, prd_ClassData_path)
-    df_attempt = read_csv_file(ATTEMPTDATA_CSV_FILE_PATH, prd_AttemptData_path)
+    df_test = cm.read_csv_file(TESTS_CSV_FILE_PATH, prd_TestsList_path)
+    df_user = cm.read_csv_file(USERDATA_CSV_FILE_PATH, prd_UserData_path)
+    df_class = cm.read_csv_file(CLASSDATA_CSV_FILE_PATH, prd_ClassData_path)
+    df_attempt = cm.read_csv_file(ATTEMPTDATA_CSV_FILE_PATH, prd_AttemptData_path)
 
     # Filter for the selected TestID
     test_info = df_test[df_test['TestID'] == test_id]
@@ -107,8 +79,7 @@ def main_define_metadata():
                         'UserName': new_user_input,
                         'Password': ['123456']  # Default password for new users
                     })
-                    df_user = pd.concat([df_user, new_user_df], ignore_index=True)
-                    save_to_csv(df_user, prd_UserData_path, "New User Name recorded successfully.")
+                    save_to_csv(new_user_df, prd_UserData_path, "New User Name recorded successfully.")
                     time.sleep(0.8)
                     st.rerun()
 
@@ -131,8 +102,7 @@ def main_define_metadata():
                         'ClassName': new_class_input,
                         'TeacherName': new_teacher_input  #Temp can leave blank
                     })
-                    df_class = pd.concat([df_class, new_class_df], ignore_index=True)
-                    save_to_csv(df_class, prd_ClassData_path, "New Class Name recorded successfully.")
+                    save_to_csv(new_class_df, prd_ClassData_path, "New Class Name recorded successfully.")
                     time.sleep(0.8)
                     st.rerun()
     # Action buttons
@@ -146,6 +116,7 @@ def main_define_metadata():
         st.write(" ")
     with button_cols[2]:
         if st.button("Do Test", key='prep_test_do_test'):
+            from streamlit_js_eval import streamlit_js_eval  # Loaded on first use to keep app start-up light
             selected_user_id = df_user.loc[df_user['UserName'] == selected_user_name, 'UserID'].values[0]
             selected_class_id = df_class.loc[df_class['ClassName'] == selected_class_name, 'ClassID'].values[0]
             new_attempt_id = get_new_id(df_attempt, 'AttemptID')
@@ -160,8 +131,7 @@ def main_define_metadata():
                 'WrongList': ['']
             })
 
-            df_attempt = pd.concat([df_attempt, new_attempt_df], ignore_index=True)
-            save_to_csv(df_attempt, prd_AttemptData_path, "Test attempt recorded successfully.")
+            save_to_csv(new_attempt_df, prd_AttemptData_path, "Test attempt recorded successfully.")
             st.session_state.page = 'do_test'
             st.session_state.word_index = 1
             st.session_state.test_result = None
@@ -174,4 +144,5 @@ def main_define_metadata():
             
 
 # Run the main function
-main_define_metadata()
+if __name__ == "__main__":
+    main_define_metadata()
@@ -1,40 +1,30 @@
 import streamlit as st
 import pandas as pd
 import os
-import requests
-from PIL import Image
-from io import BytesIO
+import common as cm
+import image_store
+from Do_Test.tts_cache import get_clip, warm_clip
 import logging
-from PIL import Image
 import random
-from gtts import gTTS
-import tempfile
 import streamlit.components.v1 as components
-from streamlit_js_eval import streamlit_js_eval
-import base64
-import pyperclip
-import io
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants for file paths
-TESTS_CSV_FILE_PATH = 'Data/TestsList.csv'
-WORDS_CSV_FILE_PATH = 'Data/WordsList.csv'
-ATTEMPTDATA_CSV_FILE_PATH = 'Data/AttemptData.csv'
-PLACEHOLDER_IMAGE = "Data/image/placeholder_image.png"
 IMAGE_SIZE = 100  # Set this to the desired thumbnail size
+PREFETCH_AHEAD = 2  # Number of upcoming words whose audio and image are prepared in the background
 
-# File path for the CSV in the Streamlit environment
-prd_TestsList_path = 'prd_Data/prd_TestsListData.csv'
-prd_WordsList_path = 'prd_Data/prd_WordsListData.csv'
-prd_AttemptData_path = 'prd_Data/prd_AttemptData.csv'
+# Worker threads shared by all sessions for preparing upcoming words
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="word_prefetch")
 
-st.markdown(
-    """
+CENTER_CONTAINER_CSS = """
     <style>
     .center-container {
         display: flex;
@@ -43,45 +33,20 @@ st.markdown(
         justify-content: center;
     }
     </style>
-    """,
-    unsafe_allow_html=True
-)
-
-# Convert the sound file to base64
-def get_base64_sound(file_path):
-    with open(file_path, "rb") as sound_file:
-        data = sound_file.read()
-        return base64.b64encode(data).decode()
-
-# Convert 'beep-beep.wav' and 'cheerful.wav' files to base64 strings
-beep_sound_base64 = get_base64_sound("Data/sound/beep-beep.wav") #Kalam requirement "Data/sound/beep-beep2.wav"
-cheerful_sound_base64 = get_base64_sound("Data/sound/cheerful.wav")
-
-@st.cache_data
-def read_csv_file(repo_path, prd_path):
-    """Read data from a CSV file."""
-    try:
-        if os.path.exists(prd_path):
-            df = pd.read_csv(prd_path)
-            #st.info("Data loaded from local storage.")
-        else:
-            # Initial load from a repository, as a fallback (if needed)
-            df = pd.read_csv(repo_path)  # Replace with your default CSV
-            df.to_csv(prd_path, index=False)  # Save to local environment
-            #st.info("Data loaded from repository and saved to local storage.")
-        return df
-    except (FileNotFoundError, pd.errors.EmptyDataError, pd.errors.ParserError) as e:
-        st.error(f"Error loading file: {repo_path} - {str(e)}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Unexpected error: {e}")
-        return pd.DataFrame()
+    """
+
+# Feedback sounds are served by URL, so the browser downloads and caches them once instead of
+# receiving them on every rerun. Data/sound is registered as a component asset directory because
+# Streamlit's component handler sends audio with its real MIME type (audio/wav), which browsers
+# need to play it; static file serving sends it as text/plain.
+_sound_assets = components.declare_component("feedback_sounds", path=os.path.abspath("Data/sound"))
+BEEP_SOUND_URL = f"component/{_sound_assets.name}/beep-beep.wav" #Kalam requirement "beep-beep2.wav"
+CHEERFUL_SOUND_URL = f"component/{_sound_assets.name}/cheerful.wav"
 
 def get_filtered_words(test_id):
     """Read and filter the WordsList.csv file based on the TestID."""
     try:
-        df_words = read_csv_file(WORDS_CSV_FILE_PATH, prd_WordsList_path)
-        filtered_words = df_words[df_words['TestID'] == int(test_id)]
+        filtered_words = cm.get_filtered_words(test_id)
         return filtered_words  # Return the filtered DataFrame
     except Exception as e:
         st.error(f"Error filtering WordsList.csv: {e}")
@@ -99,21 +64,6 @@ def set_words_order(df, order_type):
     df.insert(0, 'order', order)
     return df
 
-@st.cache_data
-def fetch_and_resize_image(url, size):
-    """Fetch an image from a URL and resize it to the given size."""
-    try:
-        response = requests.get(url, timeout=5)
-        img = Image.open(BytesIO(response.content))
-        img.thumbnail((size, size))
-        return img
-    except requests.RequestException as e:
-        logger.error(f"Error fetching image from {url}: {e}")
-        return Image.open(PLACEHOLDER_IMAGE).resize((size, size))
-    except Exception as e:
-        logger.error(f"Error processing image from {url}: {e}")
-        return Image.open(PLACEHOLDER_IMAGE).resize((size, size))
-
 # Word matching function using java script to process
 def word_matching(word, tid):
     word_score = len(word) - word.count(" ")
@@ -177,8 +127,8 @@ def word_matching(word, tid):
                 </div>
                 <input type="text" id="textInput" placeholder="Enter some text" oninput="checkText()" />
 
-                <audio id="alarmSound" src="data:audio/wav;base64,{beep_sound_base64}" preload="auto"></audio> <!-- Beep alarm sound -->
-                <audio id="cheerfulSound" src="data:audio/wav;base64,{cheerful_sound_base64}" preload="auto"></audio> <!-- Cheerful sound -->
+                <audio id="alarmSound" src="{BEEP_SOUND_URL}" preload="auto"></audio> <!-- Beep alarm sound -->
+                <audio id="cheerfulSound" src="{CHEERFUL_SOUND_URL}" preload="auto"></audio> <!-- Cheerful sound -->
 
                 <script>
                     // JavaScript variables
@@ -273,13 +223,13 @@ def word_matching(word, tid):
 def show_result(current_row_data):
     tab1, tab2 = st.tabs(["Image", "Result"])
     with tab1:
-        # Check if the image URL is valid; if not, use the placeholder image
+        # The thumbnail store falls back to the placeholder image for invalid URLs
         image_url = current_row_data["Image"].iloc[0]
         col1,col2 = st.columns([1,4])
         with col1:
             st.write(" ")
         with col2:
-            st.image(fetch_and_resize_image(image_url if image_url else PLACEHOLDER_IMAGE, IMAGE_SIZE))
+            st.image(image_store.load_thumbnail(image_url, IMAGE_SIZE))
             #t = streamlit_js_eval(js_expressions="sessionStorage.getItem('wordScore');", key = "Get_Score2")         
     with tab2:  
         st.write(" ")
@@ -289,21 +239,30 @@ def show_result(current_row_data):
             word_phone = current_row_data['WordPhonetic'].iloc[0]
         st.write(f" {word_phone}")
 
-def gen_audio(word, lang_code):
-    # tts = gTTS(text = word, lang = lang_code) # Generate speech
-    # with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp: # Save the speech to a temporary file
-    #     tts.save(fp.name)
-    # return fp.name
-    tts = gTTS(text=word, lang=lang_code)
-    audio_fp = io.BytesIO()  # Create an in-memory byte stream
-    tts.write_to_fp(audio_fp)  # Write audio to the stream
-    audio_fp.seek(0)  # Move the pointer to the start of the stream
-
-    # Encode audio data to base64
-    audio_bytes = audio_fp.read()
-    audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-    
-    return audio_b64
+def _warm_word(ctx, word, lang_code, image_url):
+    """Fill the clip and thumbnail caches for one word (runs on the prefetch pool)."""
+    add_script_run_ctx(threading.current_thread(), ctx)  # Needed to use st.cache_data off the script thread
+    try:
+        warm_clip(word, lang_code, slow=False)
+        image_store.load_thumbnail(image_url, IMAGE_SIZE)
+    except Exception as e:
+        logger.warning(f"Prefetch failed for word '{word}': {e}")
+
+def prefetch_next_words(df, order_number):
+    """Prepare audio and image of the next PREFETCH_AHEAD words in the background."""
+    if 'prefetched_words' not in st.session_state:
+        st.session_state.prefetched_words = set()  # (word, language, image URL) already submitted
+    ctx = get_script_run_ctx()
+    for order in range(order_number + 1, order_number + 1 + PREFETCH_AHEAD):
+        row = df[df['order'] == order]
+        if row.empty:
+            break
+        # Keyed by content, not position: a new attempt or a random order shows other words at the same order
+        key = (row['Word'].iloc[0], row['LanguageCode'].iloc[0], row['Image'].iloc[0])
+        if key in st.session_state.prefetched_words:
+            continue
+        st.session_state.prefetched_words.add(key)
+        _prefetch_pool.submit(_warm_word, ctx, *key)
 
 def update_test_result_df(df, word_index, score):
     if score >= 0:
@@ -314,11 +273,13 @@ def update_test_result_df(df, word_index, score):
 
 # Define a function to display data of the current row
 def display_current_row(df, order_number):
+    from streamlit_js_eval import streamlit_js_eval  # Loaded on first use to keep app start-up light
     num_of_problems = len(df)
     current_row_data = df[df['order']== order_number]  
     current_word = current_row_data['Word'].iloc[0]
     current_langcode = current_row_data['LanguageCode'].iloc[0]
-    st.session_state.word_audio = gen_audio(current_word, current_langcode)
+    warm_clip(current_word, current_langcode, slow=False)  # Synthesized now, so Play Audio starts at once
+    prefetch_next_words(df, order_number)
     
     st.write(f"Problem {order_number}/{num_of_problems}")
     col1, col2 = st.columns([1,2])
@@ -342,15 +303,9 @@ def display_current_row(df, order_number):
                     """, 
                     unsafe_allow_html=True
                 )
-                # Create the HTML5 audio player using base64-encoded audio from session state
-                audio_html = f"""
-                    <audio controls autoplay>
-                    <source src="data:audio/mp3;base64,{st.session_state.word_audio}" type="audio/mp3">
-                    Your browser does not support the audio element.
-                    </audio>
-                    """
-                # Display the HTML5 audio player
-                st.markdown(audio_html, unsafe_allow_html=True)
+                # st.audio serves the cached clip from Streamlit's media endpoint as audio/mpeg;
+                # the session keeps nothing, the bytes are read from the clip cache on click
+                st.audio(get_clip(current_word, current_langcode, slow=False), format="audio/mpeg", autoplay=True)
               
     with col2:
         container_style = """
@@ -422,6 +377,8 @@ def main_do_test():
         st.session_state.page == 'test_list'
         return
     
+    st.markdown(CENTER_CONTAINER_CSS, unsafe_allow_html=True)
+
     # Initialize the word_index if not exist
     if 'word_index' not in st.session_state:
         st.session_state.word_index = 1 
@@ -438,4 +395,5 @@ def main_do_test():
     st.subheader(f"Do Test - {test_id}")
     display_current_row(df_test_words,st.session_state.word_index)
 
-main_do_test()
\ No newline at end of file
+if __name__ == "__main__":
+    main_do_test()
@@ -1,19 +1,31 @@
-import streamlit as st
 import pandas as pd
-from pydub import AudioSegment
 import os
-import base64
-from gtts import gTTS
 import io
 import glob
+import json
+import hashlib
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import common as cm
-from googletrans import Translator
+from Do_Test.tts_cache import get_clips
+from Do_Test.tts_engine import get_synthesizer
+from Do_Test import mp3_frames
+from Do_Test.languages import resolve_languages
+# pydub is imported on first use to keep app start-up light
+
+logger = logging.getLogger(__name__)
 
 #WORDS_CSV_FILE_PATH = 'Data/WordsList.csv'
 #prd_WordsList_path = 'prd_Data/prd_WordsListData.csv'
 #prd_Audio_path = 'prd_Data/prd_Audio'
 #prd_Temp_path = 'prd_Data/prd_Temp'
 
+# PCM format of streamed full-test audio (the native format of gTTS clips)
+STREAM_FRAME_RATE = 24000
+STREAM_CHANNELS = 1
+STREAM_SAMPLE_WIDTH = 2
+
 def delete_files(folder_path, file_type):
     files_to_delete = glob.glob(os.path.join(folder_path, file_type))
     print(files_to_delete)
@@ -24,98 +36,323 @@ def delete_files(folder_path, file_type):
         except Exception as e:
             print(f"Error deleting {file}: {e}")
 
-def gen_audio(word, lang_code,is_slow):
-    tts = gTTS(text=word, lang=lang_code, slow=is_slow)
-    audio_fp = io.BytesIO()  # Create an in-memory byte stream
-    tts.write_to_fp(audio_fp)  # Write audio to the stream
-    audio_fp.seek(0)  # Move the pointer to the start of the stream
+def synthesize_clips(df, word_lang_code, desc_lang_code, max_workers=None):
+    """Synthesize the word (slow) and description clips of every row concurrently.
 
-    # Encode audio data to base64
-    audio_bytes = audio_fp.read()
-    audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-    
-    return audio_b64
+    Clips missing from the cache go to the synthesizer as one batch, which requests at most
+    max_workers (default TTS_MAX_WORKERS) clips at once; identical clips are requested only once.
+    Returns (word clip, description clip) MP3 bytes in row order.
+    """
+    requests = []
+    for _, row in df.iterrows():
+        requests.append((row['Word'], word_lang_code, True))
+        requests.append((row['Description'], desc_lang_code, False))
+    clips = get_clips(requests, max_workers)
+    return list(zip(clips[0::2], clips[1::2]))
 
-def save_audio_b64_to_file(audio_b64, file_path):
-    # Decode the base64 string back to bytes
-    audio_bytes = base64.b64decode(audio_b64)
-    
-    # Write the bytes to a file
-    with open(file_path, "wb") as audio_file:
-        audio_file.write(audio_bytes)
+def decode_clip(clip):
+    """Decode MP3 bytes straight from memory, without a temporary file."""
+    from pydub import AudioSegment
+    return AudioSegment.from_file(io.BytesIO(clip), format='mp3')
 
-# Function to create audio with Finnish and Vietnamese, including silences
-def create_speech_with_pauses(word_text, desc_text, word_lang_code, desc_lang_code, audio_name, word_id, save_path):
-    # Generate Finnish speech (slow down by 60%)
-    word_response = gen_audio(word_text, word_lang_code, is_slow=True)
-    word_filename = f"{save_path}/word_{audio_name}_{word_id}.mp3"
-    save_audio_b64_to_file(word_response, word_filename)
-    word_audio = AudioSegment.from_file(word_filename)
-
-    # Generate Vietnamese speech
-    desc_response = gen_audio(desc_text, desc_lang_code, is_slow=False)
-    desc_filename = f"{save_path}/desc_{audio_name}_{word_id}.mp3"
-    save_audio_b64_to_file(desc_response, desc_filename)
-    desc_audio = AudioSegment.from_file(desc_filename)
-
-    # Create silence segments
-    one_second_silence = AudioSegment.silent(duration=1000)
-    one_and_half_second_silence = AudioSegment.silent(duration=1500)
-
-    # Sequence: Finnish -> 1s silence -> Vietnamese -> 1.5s silence -> repeat
-    combined_audio = (
-        word_audio + one_second_silence +
-        desc_audio + one_and_half_second_silence +
-        word_audio + one_second_silence +
-        desc_audio + one_and_half_second_silence
+def decode_clips(clip_pairs, max_workers=None):
+    """Decode (word clip, description clip) pairs concurrently, each distinct clip once."""
+    unique_clips = list(dict.fromkeys(clip for pair in clip_pairs for clip in pair))
+    with ThreadPoolExecutor(max_workers=max_workers or cm.TTS_MAX_WORKERS, thread_name_prefix="decode") as pool:
+        segments = dict(zip(unique_clips, pool.map(decode_clip, unique_clips)))
+    return [(segments[word_clip], segments[desc_clip]) for word_clip, desc_clip in clip_pairs]
+
+def assemble_rows(row_segments, row_frames=None):
+    """Join (word, description) AudioSegment pairs into one AudioSegment in a single pass.
+
+    Every row is: word -> 1s silence -> description -> 1.5s silence, repeated twice.
+    All segments are converted to one PCM format so their raw data can be joined once,
+    instead of copying the growing audio for every row. If row_frames is a list, the
+    length of every row in frames is appended to it.
+    """
+    from pydub import AudioSegment
+    segments = [segment for pair in row_segments for segment in pair]
+    pcm_format = (
+        max((s.frame_rate for s in segments), default=STREAM_FRAME_RATE),
+        max((s.channels for s in segments), default=STREAM_CHANNELS),
+        max((s.sample_width for s in segments), default=STREAM_SAMPLE_WIDTH),
     )
+    silences = silence_pcm(pcm_format)
 
-    return combined_audio
+    parts = []
+    frame_bytes = pcm_format[1] * pcm_format[2]
+    for word_audio, desc_audio in row_segments:
+        row_parts = row_pcm_parts(word_audio, desc_audio, pcm_format, silences)
+        parts.extend(row_parts)
+        if row_frames is not None:
+            row_frames.append(sum(len(part) for part in row_parts) // frame_bytes)
+    frame_rate, channels, sample_width = pcm_format
+    return AudioSegment(data=b''.join(parts), sample_width=sample_width, frame_rate=frame_rate, channels=channels)
 
-# Initialize the translator
-translator = Translator()
-def detect_language(data):
-    text = data
-    detected_lang = translator.detect(text)
-    return detected_lang.lang
+def to_pcm(segment, pcm_format):
+    """Return the raw data of a segment converted to (frame_rate, channels, sample_width)."""
+    frame_rate, channels, sample_width = pcm_format
+    return segment.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width).raw_data
 
-# Function to create full audio for a given TestID
-def create_full_audio(audio_name, df, save_path):
+def silence_pcm(pcm_format):
+    """Render the 1s and 1.5s silences once, to be reused for every row."""
+    from pydub import AudioSegment
+    frame_rate = pcm_format[0]
+    return (
+        to_pcm(AudioSegment.silent(duration=1000, frame_rate=frame_rate), pcm_format),
+        to_pcm(AudioSegment.silent(duration=1500, frame_rate=frame_rate), pcm_format),
+    )
+
+def row_pcm_parts(word_audio, desc_audio, pcm_format, silences):
+    """Return the PCM parts of one row: word -> 1s -> description -> 1.5s, repeated twice."""
+    one_second_silence, one_and_half_second_silence = silences
+    word_pcm, desc_pcm = to_pcm(word_audio, pcm_format), to_pcm(desc_audio, pcm_format)
+    return [word_pcm, one_second_silence, desc_pcm, one_and_half_second_silence] * 2
+
+class StreamingMp3Writer:
+    """Encode PCM chunks to an MP3 file through one ffmpeg process as they become ready.
+
+    The file is written to `<path>.part` and renamed when encoding succeeds, so a reader never
+    sees a half-written test audio.
+    """
+    def __init__(self, path, pcm_format):
+        from pydub.utils import get_encoder_name
+        frame_rate, channels, sample_width = pcm_format
+        self.path = path
+        self.tmp_path = f"{path}.part"
+        self.process = subprocess.Popen(
+            [get_encoder_name(), '-y', '-loglevel', 'error',
+             '-f', f's{sample_width * 8}le', '-ar', str(frame_rate), '-ac', str(channels), '-i', 'pipe:0',
+             '-f', 'mp3', self.tmp_path],
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+    def write(self, pcm):
+        self.process.stdin.write(pcm)
+
+    def close(self):
+        self.process.stdin.close()
+        error = self.process.stderr.read().decode(errors='replace')
+        if self.process.wait() != 0:
+            cm.delete_file(self.tmp_path)
+            raise RuntimeError(f"ffmpeg failed to encode {self.path}: {error}")
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.process.kill()
+        self.process.wait()
+        cm.delete_file(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def stream_full_audio(df, word_lang_code, desc_lang_code, full_path_to_file, window=None, progress=None):
+    """Build the full-test audio window by window, streaming each row's PCM to the encoder.
+
+    Only the current and the next window of rows (default 2 x TTS_MAX_WORKERS rows) are held
+    in memory, so peak memory does not grow with the length of the test. Clips come from the
+    clip cache, so only new words are synthesized. progress(rows done, total rows) is called
+    after every window.
+    Returns the length of every row in frames.
+    """
+    window = window or cm.TTS_MAX_WORKERS * 2
+    pcm_format = (STREAM_FRAME_RATE, STREAM_CHANNELS, STREAM_SAMPLE_WIDTH)
+    frame_bytes = STREAM_CHANNELS * STREAM_SAMPLE_WIDTH
+    silences = silence_pcm(pcm_format)
+
+    def prepare(start):
+        decoded = decode_clips(synthesize_clips(df.iloc[start:start + window], word_lang_code, desc_lang_code))
+        return [b''.join(row_pcm_parts(word_audio, desc_audio, pcm_format, silences)) for word_audio, desc_audio in decoded]
+
+    row_frames = []
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio_window") as preparer:
+        with StreamingMp3Writer(full_path_to_file, pcm_format) as writer:
+            next_rows = preparer.submit(prepare, 0)
+            for start in range(0, len(df), window):
+                rows = next_rows.result()
+                if start + window < len(df):
+                    next_rows = preparer.submit(prepare, start + window)  # Prepare the next window while encoding
+                for row_pcm in rows:
+                    writer.write(row_pcm)
+                    row_frames.append(len(row_pcm) // frame_bytes)
+                del rows
+                if progress:
+                    progress(len(row_frames), len(df))
+    return row_frames
+
+def splice_full_audio(df, word_lang_code, desc_lang_code, full_path_to_file, profile=None, reuse_row=None, progress=None):
+    """Build the full-test audio by concatenating the clips' MP3 frames, without decoding or re-encoding.
 
-    # detect Word lang and Descr lang
-    word_data = df["Word"].str.cat(sep=', ')
-    desc_data = df["Description"].str.cat(sep=', ')
-    word_lang_code = detect_language(word_data)
-    desc_lang_code = detect_language(desc_data)
-    st.write(f"learn {word_lang_code} by {desc_lang_code}")       
+    Silences are runs of silent frames. Raises ValueError when the clips do not share one MP3
+    profile (e.g. a different bitrate), so the caller can fall back to pydub. reuse_row(row_hash)
+    may return the MP3 bytes of an unchanged row from a previous build. progress(rows done,
+    total rows) is called as clips are synthesized, in windows of 2 x TTS_MAX_WORKERS rows.
+    Returns (length of every row in bytes, profile).
+    """
+    rows = [reuse_row(row_hash) if reuse_row else None for row_hash in row_hashes(df, word_lang_code, desc_lang_code)]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    window = cm.TTS_MAX_WORKERS * 2
+    for start in range(0, len(missing), window):
+        chunk = missing[start:start + window]
+        clips = synthesize_clips(df.iloc[chunk], word_lang_code, desc_lang_code)
+        for i, (word_clip, desc_clip) in zip(chunk, clips):
+            word_profile, word_frames = mp3_frames.split_frames(word_clip)
+            desc_profile, desc_frames = mp3_frames.split_frames(desc_clip)
+            profile = profile or word_profile
+            if word_profile != profile or desc_profile != profile:
+                raise ValueError(f"Clips do not share one MP3 profile: {word_profile}, {desc_profile} vs {profile}")
+            rows[i] = (word_frames, desc_frames)
+        if progress:
+            progress(len(rows) - len(missing) + start + len(chunk), len(rows))
+    if missing:
+        one_second_silence = mp3_frames.silence(profile, 1000)
+        one_and_half_second_silence = mp3_frames.silence(profile, 1500)
+        for i in missing:
+            word_frames, desc_frames = rows[i]
+            rows[i] = b''.join([word_frames, one_second_silence, desc_frames, one_and_half_second_silence] * 2)
+
+    cm.write_atomic(full_path_to_file, b''.join(rows))
+    return [len(row) for row in rows], profile
+
+# Every full-test audio TestID_<id>.mp3 has a manifest TestID_<id>.json next to it, recording
+# the audio format and, for every word, a content hash and where its row starts: in PCM frames,
+# or in bytes of the MP3 file for spliced audio.
+
+def row_hashes(df, word_lang_code, desc_lang_code):
+    """Return a content hash per row, covering everything that affects the row's audio (including the engine)."""
+    engine = get_synthesizer().name
+    return [
+        hashlib.sha256(json.dumps([row['Word'], row['Description'], word_lang_code, desc_lang_code, engine]).encode('utf-8')).hexdigest()
+        for _, row in df.iterrows()
+    ]
+
+def manifest_path(save_path, audio_name):
+    return f"{save_path}/{audio_name}.json"
+
+def _segments(df, hashes, row_lengths, unit):
+    segments = []
+    start = 0
+    for word_id, row_hash, length in zip(df['WordID'], hashes, row_lengths):
+        segments.append({'word_id': int(word_id), 'hash': row_hash, 'start': start, unit: length})
+        start += length
+    return segments
+
+def build_manifest(df, hashes, row_frames, pcm_format):
+    frame_rate, channels, sample_width = pcm_format
+    return {'frame_rate': frame_rate, 'channels': channels, 'sample_width': sample_width,
+            'segments': _segments(df, hashes, row_frames, 'frames')}
+
+def build_splice_manifest(df, hashes, row_bytes, profile):
+    return {'mode': 'splice', 'mp3_profile': list(profile), 'segments': _segments(df, hashes, row_bytes, 'bytes')}
+
+def save_manifest(path, manifest):
+    cm.write_atomic(path, json.dumps(manifest))
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+# Function to create audio with Finnish and Vietnamese, including silences
+# Function to create full audio for a given TestID
+# progress(rows done, total rows) is called as the audio is built (see audio_jobs)
+def create_full_audio(audio_name, df, save_path, mode=None, progress=None):
+    # Word lang and Descr lang, from the metadata or detected offline
+    word_lang_code, desc_lang_code = resolve_languages(df)
+    logger.info(f"{audio_name}: learn {word_lang_code} by {desc_lang_code}")
 
     final_audio_filename = f"{audio_name}.mp3"
     full_path_to_file = f"{save_path}/{final_audio_filename}"
     if os.path.exists(full_path_to_file):
         return
     
-    combined_audio = AudioSegment.silent(duration=0)  # Start with empty audio
+    hashes = row_hashes(df, word_lang_code, desc_lang_code)
+    mode = mode or cm.FULL_AUDIO_MODE
+    if mode == 'splice':
+        # Concatenate MP3 frames directly; needs every clip in the same MP3 profile
+        try:
+            row_bytes, profile = splice_full_audio(df, word_lang_code, desc_lang_code, full_path_to_file, progress=progress)
+        except ValueError as e:
+            logger.warning(f"Cannot splice {full_path_to_file}, falling back to pydub. Reason: {e}")
+            mode = 'streaming'
+        else:
+            save_manifest(manifest_path(save_path, audio_name), build_splice_manifest(df, hashes, row_bytes, profile))
+            return final_audio_filename
+    if mode == 'streaming':
+        # Encode row by row with bounded memory
+        row_frames = stream_full_audio(df, word_lang_code, desc_lang_code, full_path_to_file, progress=progress)
+        pcm_format = (STREAM_FRAME_RATE, STREAM_CHANNELS, STREAM_SAMPLE_WIDTH)
+    else:
+        # Fetch all clips concurrently, then assemble them in row order
+        clips = synthesize_clips(df, word_lang_code, desc_lang_code)
 
-    for index, row in df.iterrows():
-        word_text = row['Word']
-        desc_text = row['Description']
-        word_id = int(row['WordID'])
+        row_frames = []
+        combined_audio = assemble_rows(decode_clips(clips), row_frames)
+        pcm_format = (combined_audio.frame_rate, combined_audio.channels, combined_audio.sample_width)
 
-        # Create audio for this row
-        row_audio = create_speech_with_pauses(word_text, desc_text, word_lang_code, desc_lang_code, audio_name, word_id,cm.prd_Temp_path)
+        # Export the final combined audio for the TestID group
+        combined_audio.export(full_path_to_file, format='mp3')
+        if progress:
+            progress(len(df), len(df))
+    save_manifest(manifest_path(save_path, audio_name), build_manifest(df, hashes, row_frames, pcm_format))
+    return final_audio_filename
 
-        # Add to the combined audio
-        combined_audio += row_audio
+def update_full_audio(audio_name, df, save_path, manifest, progress=None):
+    """Rebuild a full-test audio, re-synthesizing only the words that changed since the manifest.
 
-    # Export the final combined audio for the TestID group
-    combined_audio.export(f"{save_path}/{final_audio_filename}", format='mp3')
-    cm.clear_files_in_folder(cm.prd_Temp_path)
-    return final_audio_filename
+    Spliced audio copies the MP3 bytes of unchanged rows out of the previous file. Otherwise
+    every row is encoded again from its original clip, which the clip cache still holds, so
+    unchanged words are never decoded from the previous output and re-encoded (each round would
+    lose quality). Raises ValueError if splicing is configured but the previous audio was not spliced.
+    """
+    full_path_to_file = f"{save_path}/{audio_name}.mp3"
+    word_lang_code, desc_lang_code = resolve_languages(df)
+    hashes = row_hashes(df, word_lang_code, desc_lang_code)
+    if hashes == [segment['hash'] for segment in manifest['segments']]:
+        return  # Nothing changed
+
+    if cm.FULL_AUDIO_MODE != 'splice':
+        row_frames = stream_full_audio(df, word_lang_code, desc_lang_code, full_path_to_file, progress=progress)
+        pcm_format = (STREAM_FRAME_RATE, STREAM_CHANNELS, STREAM_SAMPLE_WIDTH)
+        save_manifest(manifest_path(save_path, audio_name), build_manifest(df, hashes, row_frames, pcm_format))
+        return
+    if manifest.get('mode') != 'splice':
+        raise ValueError(f"{full_path_to_file} was not spliced")
+
+    old_segments = {segment['hash']: segment for segment in manifest['segments']}
+    with open(full_path_to_file, 'rb') as old_mp3:
+        def reuse_row(row_hash):
+            segment = old_segments.get(row_hash)
+            if segment is None:
+                return None
+            old_mp3.seek(segment['start'])
+            row = old_mp3.read(segment['bytes'])
+            return row if len(row) == segment['bytes'] else None
+
+        row_bytes, profile = splice_full_audio(df, word_lang_code, desc_lang_code, full_path_to_file,
+                                               profile=tuple(manifest['mp3_profile']), reuse_row=reuse_row,
+                                               progress=progress)
+    save_manifest(manifest_path(save_path, audio_name), build_splice_manifest(df, hashes, row_bytes, profile))
 
-def regen_full_audio(audio_name, df, save_path):
+def regen_full_audio(audio_name, df, save_path, progress=None):
     final_audio_filename = f"{audio_name}.mp3"
     full_path_to_file = f"{save_path}/{final_audio_filename}"
+    manifest = load_manifest(manifest_path(save_path, audio_name))
+    if manifest is not None and os.path.exists(full_path_to_file):
+        try:
+            update_full_audio(audio_name, df, save_path, manifest, progress)
+            return
+        except Exception as e:
+            logger.warning(f"Incremental update of {full_path_to_file} failed, rebuilding it. Reason: {e}")
     if os.path.exists(full_path_to_file):
         cm.delete_file(full_path_to_file)
-    create_full_audio(audio_name, df, save_path)
+    create_full_audio(audio_name, df, save_path, progress=progress)
     
\ No newline at end of file
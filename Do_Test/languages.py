@@ -0,0 +1,88 @@
+#languages.py
+
+import hashlib
+import threading
+import common as cm
+
+# Resolves the languages of a test's words and descriptions without any network call:
+# stored metadata (WordsList.LanguageCode, TestsList.TestLanguage) first, then offline detection.
+# Detection results are memoized per test and text, so unchanged tests are detected only once.
+
+VIETNAMESE_LETTERS = set("áàãéèíìóòõúùýăâđêôơưạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ")
+FINNISH_LETTERS = set("äöå")
+
+# Share of the texts that must contain a language's marked letters for the letter fallback to pick it
+MARKED_TEXT_SHARE = 0.5
+
+_detected = {}  # (TestID, sha256 of texts) -> language code
+_detected_lock = threading.Lock()
+
+def detect_by_letters(texts):
+    """Guess the language of texts from the share of them containing Vietnamese or Finnish letters.
+
+    A few loanwords ("café", "Tết") in mostly-English texts stay below the share and do not count.
+    """
+    counts = {'vi': 0, 'fi': 0}
+    for text in texts:
+        letters = set(text.lower())
+        if letters & VIETNAMESE_LETTERS:
+            counts['vi'] += 1
+        elif letters & FINNISH_LETTERS:
+            counts['fi'] += 1
+    language, count = max(counts.items(), key=lambda item: item[1])
+    if texts and count / len(texts) > MARKED_TEXT_SHARE:
+        return language
+    return cm.DEFAULT_LANGUAGE
+
+def detect_language(texts):
+    """Detect the language of a list of texts offline: with langdetect, else by their letters."""
+    try:
+        from langdetect import DetectorFactory, detect  # Loaded on first use to keep app start-up light
+        from langdetect.lang_detect_exception import LangDetectException
+    except ImportError:
+        pass
+    else:
+        DetectorFactory.seed = 0  # langdetect is randomized; make results repeatable
+        try:
+            return detect(', '.join(texts))
+        except LangDetectException:
+            pass
+    return detect_by_letters(texts)
+
+def _detect_cached(test_id, texts):
+    key = (test_id, hashlib.sha256('\0'.join(texts).encode('utf-8')).hexdigest())
+    with _detected_lock:
+        if key in _detected:
+            return _detected[key]
+    language = detect_language(texts)
+    with _detected_lock:
+        _detected[key] = language
+    return language
+
+def _test_id(df):
+    if 'TestID' in df.columns and not df.empty:
+        return int(df['TestID'].iloc[0])
+    return None
+
+def stored_word_language(df, test_id=None):
+    """Return the word language recorded in the metadata, or None."""
+    if 'LanguageCode' in df.columns:
+        codes = df['LanguageCode'].dropna()
+        codes = codes[codes.astype(str).str.strip() != '']
+        if not codes.empty:
+            return str(codes.mode().iloc[0])
+    if test_id is not None:
+        df_tests = cm.get_storage().load_table(cm.TESTS_CSV_FILE_PATH, cm.prd_TestsList_path)
+        languages = df_tests.loc[df_tests['TestID'] == test_id, 'TestLanguage'].dropna()
+        if not languages.empty:
+            return str(languages.iloc[0])
+    return None
+
+def resolve_languages(df):
+    """Return (word language, description language) of a test's words."""
+    test_id = _test_id(df)
+    word_language = stored_word_language(df, test_id)
+    if word_language is None:
+        word_language = _detect_cached(test_id, df['Word'].astype(str).tolist())
+    desc_language = _detect_cached(test_id, df['Description'].astype(str).tolist())
+    return word_language, desc_language
@@ -0,0 +1,99 @@
+#mp3_frames.py
+
+# Frame-level handling of MPEG Layer III streams, so clips can be concatenated
+# without decoding and re-encoding them. Only Layer III (what gTTS produces) is supported.
+
+# Sample rates per version bits: 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# Layer III bitrates in kbps per version bits
+MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    0: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+def samples_per_frame(profile):
+    return 1152 if profile[0] == 3 else 576
+
+def _frame_length(version, sample_rate, bitrate, padding):
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+def _side_info_length(version, mono):
+    if version == 3:
+        return 17 if mono else 32
+    return 9 if mono else 17
+
+def parse_header(data, pos):
+    """Return (profile, frame length, side info offset) of the Layer III frame at pos, or None.
+
+    The profile (version, sample rate, bitrate, mono) must match for frames to be spliced.
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    protected = not (b1 & 1)  # A 16-bit CRC follows the header
+    mono = (b3 >> 6) == 3
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = MP3_BITRATES[version][bitrate_index] * 1000
+    frame_length = _frame_length(version, sample_rate, bitrate, (b2 >> 1) & 1)
+    return (version, sample_rate, bitrate, mono), frame_length, 4 + (2 if protected else 0)
+
+def split_frames(data):
+    """Return (profile, frame bytes) of an MP3 clip, without its ID3 tags and Xing/Info frame.
+
+    Raises ValueError if the clip is not a single-profile (constant bitrate) Layer III stream.
+    """
+    pos = 0
+    if data[:3] == b'ID3':  # ID3v2 tag; its size is a 28-bit syncsafe integer
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+    end = len(data) - 128 if data[-128:-125] == b'TAG' else len(data)  # ID3v1 tag
+
+    profile = None
+    start = pos
+    while pos < end:
+        header = parse_header(data, pos)
+        if header is None:
+            raise ValueError(f"No MP3 frame header at byte {pos}")
+        frame_profile, frame_length, side_info_at = header
+        if pos + frame_length > end:
+            break  # Drop a truncated last frame
+        if profile is None:
+            tag_at = pos + side_info_at + _side_info_length(frame_profile[0], frame_profile[3])
+            if data[tag_at:tag_at + 4] in (b'Xing', b'Info') or data[pos + 36:pos + 40] == b'VBRI':
+                # The VBR/LAME header frame describes the clip's length, so it is dropped
+                pos += frame_length
+                start = pos
+                profile = frame_profile
+                continue
+            profile = frame_profile
+        elif frame_profile != profile:
+            raise ValueError(f"MP3 profile changes mid-clip: {frame_profile} vs {profile}")
+        pos += frame_length
+    if profile is None:
+        raise ValueError("No MP3 frames found")
+    return profile, data[start:pos]
+
+def silent_frame(profile):
+    """Build one Layer III frame that decodes to silence: all-zero side info, no main data."""
+    version, sample_rate, bitrate, mono = profile
+    bitrate_index = MP3_BITRATES[version].index(bitrate // 1000)
+    rate_index = MP3_SAMPLE_RATES[version].index(sample_rate)
+    header = bytes([
+        0xFF,
+        0xE0 | version << 3 | 1 << 1 | 1,  # Layer III, no CRC
+        bitrate_index << 4 | rate_index << 2,  # No padding
+        0xC0 if mono else 0x00,
+    ])
+    return header + bytes(_frame_length(version, sample_rate, bitrate, 0) - len(header))
+
+def silence(profile, duration_ms):
+    """Return silent frames lasting duration_ms, rounded to whole frames."""
+    frames = round(duration_ms * profile[1] / 1000 / samples_per_frame(profile))
+    return silent_frame(profile) * frames
@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import requests
-from streamlit_js_eval import streamlit_js_eval
 
 def update_test_result_df(df, word_index, score):
     if score >= 0:
@@ -29,6 +27,7 @@ def bold_words(val):
     return 'font-weight: bold' if val else ''
 
 def main_result_page():
+    from streamlit_js_eval import streamlit_js_eval  # Loaded on first use to keep app start-up light
     temp = streamlit_js_eval(js_expressions="sessionStorage.getItem('wordScore');", key = "Get_Score4")
     
     if temp != -1 and temp is not None: 
@@ -76,4 +75,5 @@ def main_result_page():
         st.session_state.AttemptID = None
         st.rerun()
     
-main_result_page()
\ No newline at end of file
+if __name__ == "__main__":
+    main_result_page()
@@ -0,0 +1,116 @@
+import os
+import hashlib
+import threading
+import common as cm
+from Do_Test.tts_engine import get_synthesizer
+
+# Content-addressed cache of synthesized speech clips, shared by every session:
+# prd_Data/prd_TTSCache/<first 2 hex chars>/<sha256 of (engine, lang, slow, text)>.mp3
+# Least recently used clips are evicted once the cache grows past TTS_CACHE_MAX_BYTES.
+
+_cache_lock = threading.Lock()
+_cache_bytes = None  # Total size of the cache, scanned on first write
+_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_key_locks = [threading.Lock() for _ in range(64)]  # Avoid synthesizing the same clip twice at once
+
+def clip_key(text, lang, slow, engine=None):
+    """Return the content hash identifying a clip of the given (default: configured) engine."""
+    engine = engine or get_synthesizer().name
+    return hashlib.sha256(f"{engine}\0{lang}\0{int(bool(slow))}\0{text}".encode('utf-8')).hexdigest()
+
+def clip_path(key):
+    return os.path.join(cm.prd_TTSCache_path, key[:2], f"{key}.mp3")
+
+def _read_clip(path):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path)  # Mark as recently used for LRU eviction
+        return data
+    except FileNotFoundError:
+        return None
+
+def _list_clips():
+    """Return (mtime, size, path) for every cached clip."""
+    clips = []
+    for root, _, files in os.walk(cm.prd_TTSCache_path):
+        for filename in files:
+            if filename.endswith('.mp3'):
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                clips.append((stat.st_mtime, stat.st_size, path))
+    return clips
+
+def _evict():
+    """Delete least recently used clips until the cache is back under 90% of its budget."""
+    global _cache_bytes
+    clips = sorted(_list_clips())
+    _cache_bytes = sum(size for _, size, _ in clips)
+    for _, size, path in clips:
+        if _cache_bytes <= cm.TTS_CACHE_MAX_BYTES * 0.9:
+            break
+        cm.delete_file(path)
+        _cache_bytes -= size
+        _cache_stats['evictions'] += 1
+
+def _store_clip(path, data):
+    global _cache_bytes
+    cm.write_atomic(path, data)  # Readers never see a partially written clip
+    with _cache_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _list_clips())
+        else:
+            _cache_bytes += len(data)
+        if _cache_bytes > cm.TTS_CACHE_MAX_BYTES:
+            _evict()
+
+def get_clip(text, lang, slow=False):
+    """Return the MP3 bytes of a speech clip, synthesizing it only if it is not cached yet."""
+    key = clip_key(text, lang, slow)
+    path = clip_path(key)
+    data = _read_clip(path)
+    if data is None:
+        with _key_locks[int(key[:8], 16) % len(_key_locks)]:
+            data = _read_clip(path)  # Another thread may have just synthesized it
+            if data is None:
+                data = get_synthesizer().synthesize(text, lang, slow)
+                _store_clip(path, data)
+                with _cache_lock:
+                    _cache_stats['misses'] += 1
+                return data
+    with _cache_lock:
+        _cache_stats['hits'] += 1
+    return data
+
+def warm_clip(text, lang, slow=False):
+    """Make sure a speech clip is cached, without reading it if it already is."""
+    key = clip_key(text, lang, slow)
+    try:
+        os.utime(clip_path(key))  # Mark as recently used for LRU eviction
+        with _cache_lock:
+            _cache_stats['hits'] += 1
+    except FileNotFoundError:
+        get_clip(text, lang, slow)
+
+def get_clips(requests, max_workers=None):
+    """Return the MP3 bytes for a list of (text, lang, slow), synthesizing all missing clips in one batch."""
+    unique_requests = list(dict.fromkeys(requests))
+    paths = {request: clip_path(clip_key(*request)) for request in unique_requests}
+    clips = {request: _read_clip(paths[request]) for request in unique_requests}
+    missing = [request for request, data in clips.items() if data is None]
+    if missing:
+        for request, data in zip(missing, get_synthesizer().synthesize_batch(missing, max_workers)):
+            _store_clip(paths[request], data)
+            clips[request] = data
+    with _cache_lock:
+        _cache_stats['hits'] += len(unique_requests) - len(missing)
+        _cache_stats['misses'] += len(missing)
+    return [clips[request] for request in requests]
+
+def get_tts_cache_stats():
+    """Return the hit/miss/eviction counters of the clip cache."""
+    with _cache_lock:
+        return dict(_cache_stats, bytes=_cache_bytes)
@@ -0,0 +1,71 @@
+#tts_engine.py
+
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+import common as cm
+from Do_Test import mp3_frames
+
+# Speech synthesizers, selected by TTS_ENGINE. Every engine has:
+#   name                               -- part of the clip cache key
+#   synthesize(text, lang, slow)       -- MP3 bytes of one clip
+#   synthesize_batch(requests)         -- MP3 bytes for a list of (text, lang, slow), in order
+
+class GTTSSynthesizer:
+    """Google Translate text-to-speech (network)."""
+    name = 'gtts'
+
+    def synthesize(self, text, lang, slow=False):
+        from gtts import gTTS  # Loaded on first use to keep app start-up light
+        audio_fp = io.BytesIO()  # Create an in-memory byte stream
+        gTTS(text=text, lang=lang, slow=slow).write_to_fp(audio_fp)
+        return audio_fp.getvalue()
+
+    def synthesize_batch(self, requests, max_workers=None):
+        # One HTTP request per clip, so clips are requested concurrently
+        with ThreadPoolExecutor(max_workers=max_workers or cm.TTS_MAX_WORKERS, thread_name_prefix="tts") as pool:
+            return list(pool.map(lambda request: self.synthesize(*request), requests))
+
+class LocalSynthesizer:
+    """Offline, deterministic stand-in for load tests and benchmarks.
+
+    Returns silent MP3 frames in the gTTS profile (MPEG2 Layer III, 24 kHz mono, 32 kbps), timed
+    like speech: 400 ms plus 70 ms per character, 1.5x as long when slow. latency_ms simulates
+    the round trip of a remote engine.
+    """
+    name = 'local'
+    PROFILE = (2, 24000, 32000, True)
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+
+    def duration_ms(self, text, slow=False):
+        duration = 400 + 70 * len(text)
+        return duration * 1.5 if slow else duration
+
+    def synthesize(self, text, lang, slow=False):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return mp3_frames.silence(self.PROFILE, self.duration_ms(text, slow))
+
+    def synthesize_batch(self, requests, max_workers=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)  # One round trip for the whole batch
+        return [mp3_frames.silence(self.PROFILE, self.duration_ms(text, slow)) for text, _, slow in requests]
+
+def create_synthesizer(name):
+    """Create the synthesizer called `name` ('gtts' or 'local')."""
+    if name == 'gtts':
+        return GTTSSynthesizer()
+    if name == 'local':
+        return LocalSynthesizer(cm.TTS_LOCAL_LATENCY_MS)
+    raise ValueError(f"Unknown speech synthesizer: {name}")
+
+_synthesizer = None
+
+def get_synthesizer():
+    """Return the process-wide synthesizer selected by TTS_ENGINE."""
+    global _synthesizer
+    if _synthesizer is None:
+        _synthesizer = create_synthesizer(cm.TTS_ENGINE)
+    return _synthesizer
@@ -0,0 +1,54 @@
+# Benchmark full-test audio assembly: repeated `+=` versus the single-pass join.
+# Run from the repository root: python Learn/bench_audio_assembly.py [max_words]
+# Clips are generated tones, so no network or ffmpeg is involved.
+
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from pydub import AudioSegment
+from pydub.generators import Sine
+from Do_Test.gen_audio import assemble_rows
+
+def make_rows(num_words):
+    """Return (word, description) segment pairs shaped like gTTS output (24 kHz mono)."""
+    rows = []
+    for i in range(num_words):
+        word = Sine(440 + i % 50).to_audio_segment(duration=900).set_frame_rate(24000).set_channels(1)
+        desc = Sine(660 + i % 50).to_audio_segment(duration=1400).set_frame_rate(24000).set_channels(1)
+        rows.append((word, desc))
+    return rows
+
+def assemble_incremental(row_segments):
+    """The previous approach: grow the combined audio row by row."""
+    one_second_silence = AudioSegment.silent(duration=1000)
+    one_and_half_second_silence = AudioSegment.silent(duration=1500)
+    combined_audio = AudioSegment.silent(duration=0)
+    for word_audio, desc_audio in row_segments:
+        combined_audio += (
+            word_audio + one_second_silence +
+            desc_audio + one_and_half_second_silence +
+            word_audio + one_second_silence +
+            desc_audio + one_and_half_second_silence
+        )
+    return combined_audio
+
+def timed(func, rows):
+    start = time.perf_counter()
+    func(rows)
+    return time.perf_counter() - start
+
+def main():
+    max_words = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'words':>6} {'incremental (s)':>16} {'single pass (s)':>16}")
+    num_words = 10
+    while num_words <= max_words:
+        rows = make_rows(num_words)
+        print(f"{num_words:>6} {timed(assemble_incremental, rows):>16.3f} {timed(assemble_rows, rows):>16.3f}")
+        num_words *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Benchmark the search index: full build, incremental update and queries on synthetic words.
+# Run from the repository root: python Learn/bench_search.py [words]
+
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import pandas as pd
+from search_index import SearchIndex
+
+SYLLABLES = ['ta', 'lo', 'koi', 'ra', 'äi', 'ti', 'phở', 'ngôi', 'nhà', 'đường', 'sữa', 'mẹ', 'kä', 'vi', 'sa']
+
+def make_words(num_words):
+    rng = random.Random(0)
+    def text(parts):
+        return ' '.join(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) for _ in range(parts))
+    return pd.DataFrame({
+        'WordID': range(1, num_words + 1),
+        'Word': [text(1) for _ in range(num_words)],
+        'Description': [text(4) for _ in range(num_words)],
+    })
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    print(f"  {label:<36} {(time.perf_counter() - start) * 1000 / repeat:9.3f} ms")
+    return result
+
+def main():
+    num_words = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    df = make_words(num_words)
+    index = SearchIndex('WordID', ['Word', 'Description'])
+    print(f"{num_words} words:")
+    timed("full build", lambda: index.update(df))
+
+    edited = df.copy()
+    edited.loc[edited.index[:10], 'Description'] = 'uusi kuvaus mới'
+    timed("incremental update (10 rows)", lambda: index.update(edited))
+    for query in ['pho', 'duong sua', 'ai', 'moi']:
+        keys = timed(f"search '{query}'", lambda: index.search(query), repeat=20)
+        print(f"    {len(keys)} matches")
+
+if __name__ == "__main__":
+    main()
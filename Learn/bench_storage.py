@@ -0,0 +1,57 @@
+# Benchmark the CSV and SQLite storage backends side by side.
+# Run from the repository root: python Learn/bench_storage.py [rows]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import common as cm
+import storage
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000 / repeat:8.3f} ms/op")
+
+def bench_backend(backend, rows):
+    print(f"{backend.name}:")
+    df = backend.load_table(cm.ATTEMPTDATA_CSV_FILE_PATH, cm.prd_AttemptData_path)
+    next_id = int(df['AttemptID'].max()) + 1
+
+    def insert(i):
+        backend.insert_rows({
+            'AttemptID': [next_id + i], 'UserID': [1], 'ClassID': [1], 'TestID': [i % 37 + 1],
+            'TotalQuestion': [''], 'CorrectList': [''], 'WrongList': [''],
+        }, cm.prd_AttemptData_path)
+
+    timed(f"insert ({rows} attempts)", insert, rows)
+    timed("keyed update", lambda i: backend.update_rows(
+        {'TotalQuestion': 10}, cm.prd_AttemptData_path, key=next_id + i), min(rows, 200))
+    timed("keyed delete", lambda i: backend.delete_rows(
+        cm.prd_AttemptData_path, key=next_id + i), min(rows, 200))
+    timed("read (cached)", lambda i: backend.load_table(
+        cm.ATTEMPTDATA_CSV_FILE_PATH, cm.prd_AttemptData_path), 100)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workdir = tempfile.mkdtemp(prefix="bench_storage_")
+    try:
+        shutil.copytree(os.path.join(REPO_ROOT, "Data"), os.path.join(workdir, "Data"))
+        os.chdir(workdir)
+        os.makedirs(cm.prd_Data_path)
+        bench_backend(storage.CsvBackend(), rows)
+        bench_backend(storage.SqliteBackend(cm.prd_Database_path), rows)
+        print(f"table cache: {cm.get_table_cache_stats()}")
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Report what importing the app and each page costs at start-up.
+# Run from the repository root: python Learn/import_report.py [top_n]
+# Uses `python -X importtime`, so every measurement starts from a cold interpreter.
+
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported on the start-up path, then each page module on its own
+MODULES = [
+    'app',
+    'Do_Test.all_tests_list',
+    'Manage_Test.edit_test',
+    'Manage_Test.backup_tests',
+]
+
+# Heavy dependencies that should only be loaded on first use
+HEAVY_MODULES = ['gtts', 'pydub', 'googletrans', 'PIL', 'requests', 'st_aggrid', 'chardet', 'streamlit_js_eval']
+
+def import_times(module):
+    """Import `module` in a fresh interpreter and return {package: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(f"  import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Keep the outermost (least indented) entry of each module
+        name = name.rstrip()
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        if name not in times or depth < times[name][1]:
+            times[name] = (int(cumulative), depth)
+    return {name: us for name, (us, _) in times.items()}
+
+def main():
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for module in MODULES:
+        times = import_times(module)
+        total = times.get(module, 0)
+        print(f"{module}: {total / 1000:.0f} ms")
+        heavy = [name for name in HEAVY_MODULES if name in times]
+        print(f"  heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+        top = sorted(((us, name) for name, us in times.items() if '.' not in name and name != module), reverse=True)
+        for us, name in top[:top_n]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
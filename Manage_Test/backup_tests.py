@@ -3,8 +3,9 @@ import pandas as pd
 import logging
 import os
 import common as cm
-from Do_Test.gen_audio import create_full_audio
-from Do_Test.gen_audio import regen_full_audio
+from storage import TABLES
+from Do_Test.gen_audio import manifest_path
+from Do_Test.audio_jobs import submit_audio_job, get_job_status, show_job_progress, ACTIVE_STATES
 
 # Setup logging
 #logging.basicConfig(level=logging.INFO)
@@ -39,6 +40,11 @@ def show_test_list(df):
             button_label=""
             audio_name = f"TestID_{row['TestID']}"
             file_path = f"{cm.prd_Audio_path}/{audio_name}.mp3"
+            job = get_job_status(row['TestID'])
+            if job is not None and job['state'] in ACTIVE_STATES:
+                show_job_progress(row['TestID'], rerun_when_finished=True)
+            elif job is not None and job['state'] == 'failed':
+                st.error(f"Last audio build failed: {job['error']}")
             if os.path.exists(file_path):
                 st.audio(file_path, format="audio/mpeg", autoplay=False, loop=False)
                 button_label ="Regen Audio"
@@ -47,51 +53,47 @@ def show_test_list(df):
                 button_label ="Create Audio"
         # Add button to the last column and handle click
         if cols[4].button(button_label, key=f"button_GenAudio_{index}"):
-            df_word = cm.read_csv_file(cm.WORDS_CSV_FILE_PATH, cm.prd_WordsList_path)
-            filtered_df = df_word[df_word['TestID'] == int(row['TestID'])]
-            regen_full_audio(audio_name, filtered_df, cm.prd_Audio_path)
+            # Built in the background; the row shows its progress
+            submit_audio_job(row['TestID'], 'regen')
             st.rerun()
         if cols[5].button("Delete", key=f"button_Delete_{index}"):
             cm.delete_file(file_path)
+            cm.delete_file(manifest_path(cm.prd_Audio_path, audio_name))
             st.rerun()
 
-st.title('Back up data')
+def main_backup_tests():
+    """Main Page of Backup tests data."""
+    st.title('Back up data')
 
-tab1, tab2, tab3 = st.tabs(["Text Data", "Audio Data", "Edit Audio"])
-with tab1:
-    st.write('This is a page to download all data from host')
+    tab1, tab2, tab3 = st.tabs(["Text Data", "Audio Data", "Edit Audio"])
+    with tab1:
+        st.write('This is a page to download all data from host')
 
-    # Set the directory where your CSV files are stored
-    folder_path = "prd_Data"  # Change this to your CSV directory path
+        # Export every table through the storage backend, so the backup is current with
+        # STORAGE_BACKEND=sqlite too (its prd_Data CSV files are not written any more)
+        for prd_path, (_, _, repo_path) in TABLES.items():
+            filename = os.path.basename(prd_path)
+            try:
+                df = cm.get_storage().load_table(repo_path, prd_path)
+            except Exception as e:
+                st.error(f"Cannot export {filename}: {e}")
+                continue
 
-    # Loop through each file in the directory
-    if os.path.exists(folder_path):  # Check if the folder exists and is a directory
-        for filename in os.listdir(folder_path):
-            if filename.endswith(".csv"):
-                file_path = os.path.join(folder_path, filename)
+            # Create a download button for each table, as UTF-8 with BOM
+            st.download_button(
+                label=f"Download {filename}",
+                data=df.to_csv(index=False).encode("utf-8-sig"),
+                file_name=filename,
+                mime="text/csv"
+            )
+    with tab2:
+        # Specify the path of the directory you want to display
+        directory_path = cm.prd_Data_path  # Current directory or specify a custom path
+        display_directory_tree(directory_path)
+    with tab3:
+        df = cm.read_csv_file(cm.TESTS_CSV_FILE_PATH, cm.prd_TestsList_path)
 
-                # Read the file contents with UTF-8 BOM encoding
-                with open(file_path, "r", encoding="utf-8-sig") as file:
-                    file_content = file.read()
-
-                # Convert the content back to bytes for the download button
-                file_bytes = file_content.encode("utf-8-sig")
-
-                # Create a download button for each file
-                st.download_button(
-                    label=f"Download {filename}",
-                    data=file_bytes,
-                    file_name=filename,
-                    mime="text/csv"
-                )
-    else: 
-        st.warning(f"Cannot find '{folder_path}' folder")
-with tab2:
-    # Specify the path of the directory you want to display
-    directory_path = cm.prd_Data_path  # Current directory or specify a custom path
-    display_directory_tree(directory_path)
-with tab3:
-    df = cm.read_csv_file(cm.TESTS_CSV_FILE_PATH, cm.prd_TestsList_path)
-    
-    show_test_list(df)
+        show_test_list(df)
 
+if __name__ == "__main__":
+    main_backup_tests()
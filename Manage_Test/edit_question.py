@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import common as cm
 import os
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 
 # Constants
 # TESTS_CSV_FILE_PATH = 'Data/TestsList.csv'  # Adjust the path if necessary
@@ -34,8 +33,8 @@ from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 def get_filtered_words(test_id):
     """Read and filter the WordsList.csv file based on the TestID."""
     try:
+        filtered_words = cm.get_filtered_words(test_id)
         df_words = cm.read_csv_file(cm.WORDS_CSV_FILE_PATH, cm.prd_WordsList_path)
-        filtered_words = df_words[df_words['TestID'] == int(test_id)]
         return filtered_words, df_words  # Return both the filtered and full DataFrame
     except Exception as e:
         st.error(f"Error filtering WordsList.csv: {e}")
@@ -43,6 +42,7 @@ def get_filtered_words(test_id):
 
 def show_editable_table_with_delete(df, full_df, test_id):
     """Display the editable table with AgGrid, including delete functionality, and return the edited DataFrame."""
+    from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode  # Loaded on first use to keep app start-up light
     gb = GridOptionsBuilder.from_dataframe(df)
     
     # Enable cell editing
@@ -81,11 +81,8 @@ def show_editable_table_with_delete(df, full_df, test_id):
             # Display the delete button
             if st.button("Delete Selected Word"):
                 try:
-                    # Filter out the row with the selected WordID
-                    full_df = full_df[full_df['WordID'] != word_id_to_delete]
-                    
-                    # Save the updated DataFrame back to the CSV
-                    full_df.to_csv(cm.prd_WordsList_path, index=False)
+                    # Delete the row with the selected WordID
+                    cm.get_storage().delete_rows(cm.prd_WordsList_path, key=word_id_to_delete)
                     
                     st.success(f"Word ID {word_id_to_delete} has been deleted successfully!")
                     st.rerun()  # Refresh the page to reflect the changes
@@ -109,17 +106,12 @@ def show_editable_table_with_delete(df, full_df, test_id):
 def update_words_csv(updated_df, full_df, test_id):
     """Update the WordsList.csv file with the edited DataFrame for the specific TestID."""
     try:
-        # Drop the rows with the current TestID from the original DataFrame
-        full_df = full_df[full_df['TestID'] != int(test_id)]
-        
-        # Append the updated rows for the current TestID
-        full_df = pd.concat([full_df, updated_df], ignore_index=True)
+        # Replace the rows of the current TestID with the updated rows
+        cm.get_storage().replace_rows('TestID', int(test_id), updated_df, cm.prd_WordsList_path)
         
         # Debugging: Display unique Test IDs to ensure data integrity
+        full_df = cm.read_csv_file(cm.WORDS_CSV_FILE_PATH, cm.prd_WordsList_path)
         st.write(f'Unique Test IDs = {full_df["TestID"].unique()}')
-
-        # Save the updated DataFrame back to the CSV
-        full_df.to_csv(cm.prd_WordsList_path, index=False)
         st.success("WordsList.csv has been updated successfully!")
     except Exception as e:
         st.error(f"Error updating WordsList.csv: {e}")
@@ -148,11 +140,8 @@ def insert_new_word(new_word, language_code, new_WordPhonetic, new_WordDescripti
         # Convert the new row to a DataFrame
         new_row_df = pd.DataFrame([new_row])
 
-        # Concatenate the new row with the full DataFrame
-        full_df = pd.concat([full_df, new_row_df], ignore_index=True)
-
-        # Save the updated DataFrame back to the CSV
-        full_df.to_csv(cm.prd_WordsList_path, index=False)
+        # Append the new row to the words table
+        cm.get_storage().insert_rows(new_row_df, cm.prd_WordsList_path)
         st.success("New word has been added successfully!")
         st.rerun()
     except Exception as e:
@@ -230,8 +219,9 @@ def show_question_editor():
             update_words_csv(edited_df, full_df, test_id)
     st.write("---")
 
-# Ensure 'page' is initialized
-if "page" not in st.session_state:
-    st.session_state["page"] = "table"  # Default to the main table
-elif st.session_state.page == 'edit_question':
-    show_question_editor()
+if __name__ == "__main__":
+    # Ensure 'page' is initialized
+    if "page" not in st.session_state:
+        st.session_state["page"] = "table"  # Default to the main table
+    elif st.session_state.page == 'edit_question':
+        show_question_editor()
@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
 import os
-import requests
 import common as cm
-from io import BytesIO
+import image_store
 from PIL import ImageOps, Image
 from Manage_Test import upload_test as up
 
@@ -11,22 +10,9 @@ from Manage_Test.edit_question import show_question_editor
 
 # Constants
 #TESTS_CSV_FILE_PATH = 'Data/TestsList.csv'
-PLACEHOLDER_IMAGE = "Data/image/placeholder_image.png"
 IMAGE_SIZE = 60
 
 # Image-related Functions
-@st.cache_data
-def fetch_image(link):
-    """Fetch image from the provided URL."""
-    try:
-        if not pd.isna(link) and link.strip():
-            response = requests.get(link)
-            if response.status_code == 200:
-                return Image.open(BytesIO(response.content))
-    except Exception:
-        pass  # Silent fail on error
-    return None
-
 def resize_and_crop_image(image, size):
     """Resize and crop the image to a square."""
     try:
@@ -36,20 +22,12 @@ def resize_and_crop_image(image, size):
 
 def display_image_or_text(link, column, size=IMAGE_SIZE):
     """Display image or placeholder if the link is invalid."""
-    image = fetch_image(link)
-    
+    # Crop from the largest stored thumbnail, which the store replaces with the placeholder if needed
+    image = resize_and_crop_image(image_store.load_thumbnail(link, max(cm.THUMBNAIL_SIZES)), size)
     if image:
-        image = resize_and_crop_image(image, size)
-        if image:
-            column.image(image, width=size)
-    if not image:  # If fetching image failed, show the placeholder
-        try:
-            placeholder = Image.open(PLACEHOLDER_IMAGE)
-            placeholder = resize_and_crop_image(placeholder, size)
-            if placeholder:
-                column.image(placeholder, width=size)
-        except Exception as e:
-            st.error(f"Error displaying placeholder image: {e}")
+        column.image(image, width=size)
+    else:
+        st.error(f"Error displaying image: {link}")
 
 # UI Functions
 def show_data_table():
@@ -58,6 +36,7 @@ def show_data_table():
     if df.empty:
         st.write("No tests available.")
         return
+    page_df = cm.paginate(df, "edit_test")  # Only the rows of the current page are built
  
     # Display the table header
     st.write(
@@ -81,7 +60,10 @@ def show_data_table():
     if 'rename_mode' not in st.session_state:
         st.session_state.rename_mode = None  # Track the index of the row in rename mode
 
-    for i, row in df.iterrows():
+    # Download the page's images at once; the rows below then render from the cache
+    image_store.prefetch(image_store.load_thumbnail, [(link, max(cm.THUMBNAIL_SIZES)) for link in page_df['Image']])
+
+    for i, row in page_df.iterrows():
         display_table_row(i, row, df)
     col1, col2 = st.columns([1,1])
     with col1:
@@ -126,7 +108,7 @@ def handle_rename_mode(row_index, row, cols):
     done_button = cols[len(row)].button('✅', help="Done", key=f'done_{row_index}')
     if done_button:
         st.session_state.rename_mode = None
-        cm.update_to_csv(row_index = row_index, new_data = new_data, repo_path = cm.TESTS_CSV_FILE_PATH, prd_path = cm.prd_TestsList_path)
+        cm.update_to_csv(row_index = row_index, new_data = new_data, repo_path = cm.TESTS_CSV_FILE_PATH, prd_path = cm.prd_TestsList_path, key = row['TestID'])
         st.rerun()
 
 def handle_normal_mode(row_index, row, cols):
@@ -171,7 +153,7 @@ def handle_normal_mode(row_index, row, cols):
         st.rerun()
 
     if delete_button:
-        cm.delete_from_csv(row_index=row_index, repo_path=cm.TESTS_CSV_FILE_PATH, prd_path=cm.prd_TestsList_path)
+        cm.delete_from_csv(row_index=row_index, repo_path=cm.TESTS_CSV_FILE_PATH, prd_path=cm.prd_TestsList_path, key=row['TestID'])
         st.rerun() 
 
 def add_test_form():
@@ -224,14 +206,18 @@ def show_page_testlist():
     elif st.session_state.page == 'upload_page':
         up.show_upload_page()
 
-# Main Page of Edit Test
-# Main Page Title
-st.title("Edit Your Tests")  
+def main_edit_test():
+    """Main Page of Edit Test."""
+    # Main Page Title
+    st.title("Edit Your Tests")  
+
+    if 'page' not in st.session_state:
+        st.session_state.page = 'table'
+    if 'selected_test' not in st.session_state:
+        st.session_state.selected_test = None
 
-if 'page' not in st.session_state:
-    st.session_state.page = 'table'
-if 'selected_test' not in st.session_state:
-    st.session_state.selected_test = None
+    show_page_testlist()
 
-show_page_testlist()
+if __name__ == "__main__":
+    main_edit_test()
 
@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
-import chardet
-import os
+import common as cm
 
 # Define the expected column names
 expected_columns = ['WordID', 'TestID', 'Word', 'LanguageCode', 'WordPhonetic', 'Description', 'Image']
@@ -35,12 +34,9 @@ def check_required_fields(df):
     return True
 
 def autogen_wordID(edited_df, csv_path):
-    if os.path.exists(csv_path):
-        existing_df = pd.read_csv(csv_path)
-        if not existing_df['WordID'].empty:
-            max_wordID = int(existing_df['WordID'].max())
-        else:
-            max_wordID = 0
+    existing_df = cm.get_storage().load_table(cm.WORDS_CSV_FILE_PATH, csv_path)
+    if not existing_df['WordID'].empty:
+        max_wordID = int(existing_df['WordID'].max())
     else:
         max_wordID = 0
 
@@ -50,12 +46,7 @@ def autogen_wordID(edited_df, csv_path):
     return edited_df
 
 def save_to_csv(dataframe, path):
-    if os.path.exists(path):
-        existing_df = pd.read_csv(path)
-        updated_df = pd.concat([existing_df, dataframe], ignore_index=True)
-    else:
-        updated_df = dataframe
-    updated_df.to_csv(path, index=False, encoding='utf-8-sig')
+    cm.get_storage().insert_rows(dataframe, path)
 
 def show_upload_page():
     st.write("### Upload Words from CSV")
@@ -65,6 +56,7 @@ def show_upload_page():
         
     if uploaded_file is not None:
         # Step 2: Check encoding
+        import chardet  # Loaded on first use to keep app start-up light
         raw_data = uploaded_file.read()
         result = chardet.detect(raw_data)
         uploaded_file.seek(0)  # Reset file pointer to the start
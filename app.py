@@ -1,8 +1,21 @@
 import streamlit as st
 import pandas as pd
 import os
+import sys
 import common as cm
 import time
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Page file -> (module, entry function). Each page module is imported once per process
+# and only its entry function runs on a rerun.
+PAGE_ROUTES = {
+    'Do_Test/all_tests_list.py': ('Do_Test.all_tests_list', 'main_show_test_list'),
+    'Manage_Test/edit_test.py': ('Manage_Test.edit_test', 'main_edit_test'),
+    'Manage_Test/backup_tests.py': ('Manage_Test.backup_tests', 'main_backup_tests'),
+}
 
 def set_custom_css():
     """Set custom CSS for wider table, row borders, and hover effects."""
@@ -42,6 +55,24 @@ def set_custom_css():
         unsafe_allow_html=True,
     )
 
+def get_page_entry(url):
+    """Return the entry function of a page, importing its module on first use."""
+    module_name, entry_name = PAGE_ROUTES[url]
+    if module_name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        logger.info(f"Imported page {module_name} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return getattr(sys.modules[module_name], entry_name)
+
+def run_page(url):
+    """Run the entry function of the selected page and log its CPU time."""
+    entry = get_page_entry(url)
+    start = time.thread_time()
+    try:
+        entry()
+    finally:
+        logger.debug(f"Page {url} ran in {(time.thread_time() - start) * 1000:.1f} ms CPU")
+
 # Define the correct passkey
 correct_passkey = "class4vn"
 
@@ -101,10 +132,7 @@ def main():
         else:
             st.write(f"Selected Page: {st.session_state.page}") #IMPORTANT FOR DEBUG
             st.session_state.passkey_validated = False
-            # Open the file with the correct encoding (usually UTF-8)
-            with open(st.session_state.url, 'r', encoding='utf-8') as f:
-                code = f.read()
-            exec(code, globals())  # Execute the selected page
+            run_page(st.session_state.url)  # Execute the selected page
     else:
         st.session_state.page = 'test_list'
         st.session_state.url = 'Do_Test/all_tests_list.py'
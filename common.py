@@ -3,6 +3,7 @@
 import streamlit as st
 import pandas as pd
 import os
+import threading
 
 # Constants for file paths
 TESTS_CSV_FILE_PATH = 'Data/TestsList.csv'
@@ -21,6 +22,58 @@ prd_AttemptData_path = 'prd_Data/prd_AttemptData.csv'
 prd_Data_path = 'prd_Data/'
 prd_Audio_path = 'prd_Data/prd_Audio'
 prd_Temp_path = 'prd_Data/prd_Temp'
+prd_Database_path = 'prd_Data/prd_Data.sqlite3'
+prd_TTSCache_path = 'prd_Data/prd_TTSCache'
+prd_AudioJobs_path = 'prd_Data/prd_AudioJobs'
+prd_Images_path = 'prd_Data/prd_Images'
+
+# Rows shown per page in the test list and the edit-test table
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', '10'))
+# Language used when a text's language is neither stored nor recognizable
+DEFAULT_LANGUAGE = 'en'
+# Disk budget of the synthesized speech clip cache
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Speech synthesizer: 'gtts' (Google, network) or 'local' (offline, deterministic silence for load tests)
+TTS_ENGINE = os.environ.get('TTS_ENGINE', 'gtts')
+# Simulated round-trip time of the 'local' synthesizer, in milliseconds
+TTS_LOCAL_LATENCY_MS = int(os.environ.get('TTS_LOCAL_LATENCY_MS', '0'))
+# Thumbnail sizes (longest side, px) generated for every image: edit test, test list, do test, metadata
+THUMBNAIL_SIZES = (60, 80, 100, 140)
+# Maximum number of images downloaded at once, across all sessions
+IMAGE_FETCH_WORKERS = 8
+# Kept-alive connections per image host (the pooled HTTP session blocks beyond that)
+IMAGE_HOST_CONNECTIONS = 4
+# Stored images older than this are revalidated with their origin (ETag / Last-Modified)
+IMAGE_MAX_AGE_SECONDS = 24 * 3600
+# Image downloads give up quickly: seconds to connect and to wait for data
+IMAGE_CONNECT_TIMEOUT = 2
+IMAGE_READ_TIMEOUT = 4
+# A failed image URL is not retried for this many seconds (the placeholder is shown instead)
+IMAGE_NEGATIVE_TTL_SECONDS = 600
+# After this many failures in a row, an image host is skipped for IMAGE_HOST_COOLDOWN_SECONDS
+IMAGE_HOST_FAILURE_THRESHOLD = 3
+IMAGE_HOST_COOLDOWN_SECONDS = 60
+# Maximum number of speech clips synthesized concurrently when building full-test audio
+TTS_MAX_WORKERS = 8
+# Number of full-test audio builds run at the same time, and how often pages poll their progress
+AUDIO_JOB_WORKERS = 2
+AUDIO_JOB_POLL_SECONDS = 1
+# How full-test audio is built: 'streaming' (bounded memory), 'memory' (whole test in RAM)
+# or 'splice' (MP3 frames concatenated without re-encoding, falls back to 'streaming')
+FULL_AUDIO_MODE = os.environ.get('FULL_AUDIO_MODE', 'streaming')
+
+# Storage engine behind the CRUD helpers: 'csv' (default) or 'sqlite'
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'csv')
+_storage = None
+
+# Process-wide table store shared by all sessions:
+# cache key -> (data signature, DataFrame, {column: {value: row positions}})
+_table_cache = {}
+_table_cache_lock = threading.Lock()
+_table_cache_stats = {'hits': 0, 'misses': 0}
+
+# Flush appended rows to disk before returning (set False to trade durability for speed)
+CSV_APPEND_FSYNC = True
 
 def initialize_folder(directory_path):
     # Create the directory if it doesn't exist
@@ -43,6 +96,21 @@ def delete_file(file_path):
     except Exception as e:
             print(f'Failed to delete {file_path}. Reason: {e}')
 
+def write_atomic(path, data):
+    """Write bytes (or text, as UTF-8) to path through a temporary file and rename it into place,
+    so readers never see a partially written file. Creates the parent folder if needed."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Unique per writer
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        delete_file(tmp_path)
+        raise
+
 def initialize_data():
     # Load CSV data
     df_test = read_csv_file(TESTS_CSV_FILE_PATH, prd_TestsList_path)
@@ -53,18 +121,90 @@ def initialize_data():
     # Clear variables to free up memory
     del df_test, df_word, df_user, df_class, df_attempt
 
+def _file_signature(path):
+    """Return the (mtime, size) pair used to detect changes to a data file."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_cached_table(cache_key, signature, loader):
+    """Return the shared DataFrame stored under cache_key, calling loader() only when
+    the signature of the underlying data changed.
+
+    The returned DataFrame is shared by every session and must not be modified;
+    use read_csv_file() to get a private copy.
+    """
+    with _table_cache_lock:
+        entry = _table_cache.get(cache_key)
+        if entry is not None and entry[0] == signature:
+            _table_cache_stats['hits'] += 1
+            return entry[1]
+        _table_cache_stats['misses'] += 1
+    df = loader()
+    with _table_cache_lock:
+        _table_cache[cache_key] = (signature, df, {})
+    return df
+
+def load_csv_table(repo_path, prd_path):
+    """Return the shared DataFrame for a CSV file, parsing it only when the file changed."""
+    if not os.path.exists(prd_path):
+        # Initial load from a repository, as a fallback (if needed)
+        df = pd.read_csv(repo_path)
+        df.to_csv(prd_path, index=False)  # Save to local environment
+    return get_cached_table(prd_path, _file_signature(prd_path), lambda: pd.read_csv(prd_path))
+
+def get_table_index(repo_path, prd_path, column):
+    """Return the shared DataFrame of a table and a {value: row positions} index on
+    one of its columns. The index is built once per data version of the table.
+    """
+    storage = get_storage()
+    df = storage.load_table(repo_path, prd_path)
+    cache_key = storage.cache_key(prd_path)
+    with _table_cache_lock:
+        entry = _table_cache.get(cache_key)
+        if entry is not None and entry[1] is df and column in entry[2]:
+            return df, entry[2][column]
+    index = df.groupby(column, sort=False).indices
+    with _table_cache_lock:
+        entry = _table_cache.get(cache_key)
+        if entry is not None and entry[1] is df:
+            entry[2][column] = index
+    return df, index
+
+def get_filtered_words(test_id):
+    """Return the words of one test, read through the per-TestID index of WordsList."""
+    df_words, index = get_table_index(WORDS_CSV_FILE_PATH, prd_WordsList_path, 'TestID')
+    return df_words.iloc[index.get(int(test_id), [])].copy()
+
+def invalidate_table_cache(cache_key=None):
+    """Drop one cached DataFrame (a CSV file path), or all of them if no key is given."""
+    with _table_cache_lock:
+        if cache_key is None:
+            _table_cache.clear()
+        else:
+            _table_cache.pop(cache_key, None)
+
+def get_table_cache_stats():
+    """Return the hit/miss counters of the shared table store."""
+    with _table_cache_lock:
+        return dict(_table_cache_stats, tables=len(_table_cache))
+
+def write_csv_table(df, prd_path):
+    """Rewrite a whole CSV file with the given DataFrame."""
+    df.to_csv(prd_path, index=False)
+    invalidate_table_cache(prd_path)
+
+def get_storage():
+    """Return the process-wide storage backend selected by STORAGE_BACKEND."""
+    global _storage
+    if _storage is None:
+        import storage
+        _storage = storage.create_backend(STORAGE_BACKEND)
+    return _storage
+
 def read_csv_file(repo_path, prd_path):
     """Read data from a CSV file."""
     try:
-        if os.path.exists(prd_path):
-            df = pd.read_csv(prd_path)
-            #st.info("Data loaded from local storage.")
-        else:
-            # Initial load from a repository, as a fallback (if needed)
-            df = pd.read_csv(repo_path)  # Replace with your default CSV
-            df.to_csv(prd_path, index=False)  # Save to local environment
-            #st.info("Data loaded from repository and saved to local storage.")
-        return df
+        return get_storage().load_table(repo_path, prd_path).copy()
     except (FileNotFoundError, pd.errors.EmptyDataError, pd.errors.ParserError) as e:
         st.error(f"Error loading file: {repo_path} - {str(e)}")
         return pd.DataFrame()
@@ -72,41 +212,82 @@ def read_csv_file(repo_path, prd_path):
         st.error(f"Unexpected error: {e}")
         return pd.DataFrame()
 
+def read_csv_columns(prd_path):
+    """Read only the header row of a CSV file."""
+    return list(pd.read_csv(prd_path, nrows=0, encoding='utf-8-sig').columns)
+
+def _ends_with_newline(path):
+    """Check whether the last byte of a non-empty file is a newline."""
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+def append_to_csv(data, prd_path, fsync=None, encoding='utf-8'):
+    """Append new rows to the CSV file without reading or rewriting the existing rows.
+
+    The header is written only when the file is new or empty; otherwise the new rows
+    are aligned to the existing header. `encoding` applies to a newly created file and
+    `fsync` defaults to CSV_APPEND_FSYNC.
+    """
+    new_df = pd.DataFrame(data)
+    write_header = not os.path.exists(prd_path) or os.path.getsize(prd_path) == 0
+    if not write_header:
+        columns = read_csv_columns(prd_path)
+        unknown = [col for col in new_df.columns if col not in columns]
+        if unknown:
+            raise ValueError(f"Columns {unknown} do not exist in {prd_path}")
+        new_df = new_df.reindex(columns=columns)
+        encoding = 'utf-8'  # Never write a BOM in the middle of the file
+    with open(prd_path, 'a', encoding=encoding, newline='') as f:
+        if not write_header and not _ends_with_newline(prd_path):
+            f.write('\n')
+        new_df.to_csv(f, header=write_header, index=False)
+        f.flush()
+        if CSV_APPEND_FSYNC if fsync is None else fsync:
+            os.fsync(f.fileno())
+    invalidate_table_cache(prd_path)
+
 def save_to_csv(data, repo_path, prd_path):
     """Save data to the CSV file."""
     try:
-        new_df = pd.DataFrame(data)
-        if os.path.exists(prd_path):
-            df = read_csv_file(repo_path, prd_path)
-            df = pd.concat([df, new_df], ignore_index=True)
-        else:
-            df = new_df
-        df.to_csv(prd_path, index=False)
-        st.cache_data.clear()
+        get_storage().insert_rows(data, prd_path)
         st.success("Data saved successfully.")
     except Exception as e:
         st.error(f"Error saving data to CSV: {e}")
 
-def delete_from_csv(row_index, repo_path, prd_path):
-    """Delete a row from the CSV file."""
+def delete_from_csv(row_index, repo_path, prd_path, key=None):
+    """Delete a row from the CSV file, by its key value if given, else by position."""
     try:
-        if os.path.exists(prd_path):
-            df = read_csv_file(repo_path , prd_path)
-            df = df.drop(index=row_index)
-            df.to_csv(prd_path, index=False)
-            st.cache_data.clear()
+        if get_storage().delete_rows(prd_path, row_index=row_index, key=key):
             st.success("Row deleted successfully.")
     except Exception as e:
         st.error(f"Error deleting row from CSV: {e}")
 
-def update_to_csv(row_index, new_data, repo_path, prd_path):
-    """Update a row in the CSV file."""
+def update_to_csv(row_index, new_data, repo_path, prd_path, key=None):
+    """Update a row in the CSV file, by its key value if given, else by position."""
     try:
-        if os.path.exists(prd_path):
-            df = read_csv_file(repo_path, prd_path)
-            df.loc[row_index] = new_data
-            df.to_csv(prd_path, index=False)
-            st.cache_data.clear()
+        if get_storage().update_rows(new_data, prd_path, row_index=row_index, key=key):
             st.success("Data updated successfully.")
     except Exception as e:
-        st.error(f"Error updating CSV file: {e}")  
\ No newline at end of file
+        st.error(f"Error updating CSV file: {e}")
+
+def paginate(df, key, page_size=None):
+    """Show page controls and return only the rows of df on the current page (index labels kept).
+
+    The page number is kept in st.session_state[f"{key}_page"], so only the visible rows are built.
+    """
+    page_size = page_size or LIST_PAGE_SIZE
+    page_count = max(1, -(-len(df) // page_size))
+    state_key = f"{key}_page"
+    page = min(st.session_state.get(state_key, 0), page_count - 1)  # The table may have shrunk
+    st.session_state[state_key] = page
+
+    def turn_page(step):
+        st.session_state[state_key] = page + step
+
+    if page_count > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        col1.button("◀ Previous", key=f"{key}_previous", on_click=turn_page, args=(-1,), disabled=page == 0)
+        col2.write(f"Page {page + 1} of {page_count} ({len(df)} rows)")
+        col3.button("Next ▶", key=f"{key}_next", on_click=turn_page, args=(1,), disabled=page == page_count - 1)
+    return df.iloc[page * page_size:(page + 1) * page_size]
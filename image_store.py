@@ -0,0 +1,270 @@
+#image_store.py
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from io import BytesIO
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+from PIL import Image
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import common as cm
+
+logger = logging.getLogger(__name__)
+
+# One on-disk thumbnail store shared by every page, kept across restarts:
+#   prd_Data/prd_Images/url/<2 hex>/<sha256 of URL>.json -> content sha256, ETag, Last-Modified, check time
+#   prd_Data/prd_Images/blob/<2 hex>/<content sha256>/   -> source, <size>.png for each THUMBNAIL_SIZES
+# Images are content-addressed, so URLs pointing to the same picture share one set of thumbnails.
+# Each source image is downloaded and decoded once, and all sizes are generated in the same pass.
+# Images older than IMAGE_MAX_AGE_SECONDS are revalidated with a conditional GET, so an unchanged
+# image costs a 304 instead of a download.
+
+# Image downloads of all sessions share one pool, so at most IMAGE_FETCH_WORKERS run at once
+_fetch_pool = ThreadPoolExecutor(max_workers=cm.IMAGE_FETCH_WORKERS, thread_name_prefix="image_fetch")
+
+def _create_session():
+    """Return an HTTP session keeping up to IMAGE_HOST_CONNECTIONS connections alive per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=cm.IMAGE_HOST_CONNECTIONS, pool_block=True)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+_session = _create_session()  # Shared by all downloads, so connections are reused
+
+# Broken links fail fast: a URL that failed is not retried for IMAGE_NEGATIVE_TTL_SECONDS, and a host
+# that failed IMAGE_HOST_FAILURE_THRESHOLD times in a row is skipped for IMAGE_HOST_COOLDOWN_SECONDS
+# (circuit breaker). After the cooldown a single request is let through to probe the host.
+_failed_urls = {}  # URL -> time until which it is not retried; expired entries are swept out
+_next_sweep = 0  # Time of the next sweep of expired _failed_urls entries
+_failing_hosts = {}  # host -> {'failures': consecutive failures, 'open_until': time until which it is skipped}
+_health_lock = threading.Lock()
+
+class ImageUnavailable(Exception):
+    """Raised, without any request, for an image URL that failed recently or whose host is failing."""
+
+def _check_available(url, host):
+    global _next_sweep
+    now = time.time()
+    with _health_lock:
+        if now >= _next_sweep:
+            # At most once per TTL, so the map only holds URLs that failed within the last TTL or two
+            for failed_url in [u for u, until in _failed_urls.items() if until <= now]:
+                del _failed_urls[failed_url]
+            _next_sweep = now + cm.IMAGE_NEGATIVE_TTL_SECONDS
+        until = _failed_urls.get(url)
+        if until is not None:
+            if until > now:
+                raise ImageUnavailable(f"{url} failed recently")
+            del _failed_urls[url]
+        state = _failing_hosts.get(host)
+        if state is None or state['failures'] < cm.IMAGE_HOST_FAILURE_THRESHOLD:
+            return
+        if state['open_until'] > now:
+            raise ImageUnavailable(f"Host {host} is failing")
+        # Cooldown is over: this request probes the host, the others keep failing fast meanwhile
+        state['open_until'] = now + cm.IMAGE_CONNECT_TIMEOUT + cm.IMAGE_READ_TIMEOUT
+
+def _record_failure(url, host=None):
+    """Remember a failed URL; pass host when the host itself failed (connection, timeout, 5xx)."""
+    now = time.time()
+    with _health_lock:
+        _failed_urls[url] = now + cm.IMAGE_NEGATIVE_TTL_SECONDS
+        if host is not None:
+            state = _failing_hosts.setdefault(host, {'failures': 0, 'open_until': 0})
+            state['failures'] += 1
+            if state['failures'] >= cm.IMAGE_HOST_FAILURE_THRESHOLD:
+                state['open_until'] = now + cm.IMAGE_HOST_COOLDOWN_SECONDS
+
+def _record_success(host, url=None):
+    """Reset a host's failure count; pass url when that URL itself was fetched successfully."""
+    with _health_lock:
+        _failing_hosts.pop(host, None)
+        if url is not None:
+            _failed_urls.pop(url, None)
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def _url_path(url):
+    key = _sha256(url.encode('utf-8'))
+    return os.path.join(cm.prd_Images_path, 'url', key[:2], f"{key}.json")
+
+def _is_remote(url):
+    return url.startswith(('http://', 'https://'))
+
+def _check_source(url):
+    """Refuse image values that are neither http(s) URLs nor files bundled next to the placeholder.
+
+    Image values come from teacher-edited data, so they must not open other files on the server.
+    """
+    if _is_remote(url):
+        return
+    bundled_dir = os.path.realpath(os.path.dirname(cm.PLACEHOLDER_IMAGE))
+    if not os.path.realpath(url).startswith(bundled_dir + os.sep):
+        raise ImageUnavailable(f"{url} is not an image URL")
+
+def _blob_dir(digest):
+    return os.path.join(cm.prd_Images_path, 'blob', digest[:2], digest)
+
+def _thumbnail_path(digest, size):
+    return os.path.join(_blob_dir(digest), f"{size}.png")
+
+def _download(url, entry=None):
+    """GET an image URL through the pooled session; with a stored entry, only if it changed (else 304)."""
+    host = urlsplit(url).netloc
+    _check_available(url, host)
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    try:
+        response = _session.get(url, headers=headers, timeout=(cm.IMAGE_CONNECT_TIMEOUT, cm.IMAGE_READ_TIMEOUT))
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        # A 4xx is a broken link on a working host; a 5xx means the host is in trouble
+        if e.response.status_code >= 500:
+            _record_failure(url, host)
+        else:
+            _record_failure(url)
+            _record_success(host)
+        raise
+    except requests.RequestException:
+        _record_failure(url, host)
+        raise
+    _record_success(host, url)
+    return response
+
+def _read_url_entry(url):
+    try:
+        with open(_url_path(url), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_url_entry(url, digest, etag=None, last_modified=None):
+    entry = {'digest': digest, 'etag': etag, 'last_modified': last_modified, 'checked_at': time.time()}
+    cm.write_atomic(_url_path(url), json.dumps(entry))
+
+def _save_thumbnails(img, digest, sizes):
+    """Save a thumbnail (longest side = size) per size, each scaled down from the previous one."""
+    if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        img = img.convert('RGB')
+    for size in sorted(sizes, reverse=True):
+        img = img.copy()
+        img.thumbnail((size, size))
+        buffer = BytesIO()
+        img.save(buffer, format='PNG')
+        cm.write_atomic(_thumbnail_path(digest, size), buffer.getvalue())
+
+def _store_blob(url, data):
+    """Store image bytes with all their THUMBNAIL_SIZES thumbnails and return their content digest."""
+    digest = _sha256(data)
+    source_path = os.path.join(_blob_dir(digest), 'source')
+    if not os.path.exists(source_path):
+        try:
+            img = Image.open(BytesIO(data))
+        except Image.UnidentifiedImageError:
+            _record_failure(url)  # Not an image
+            raise
+        with img:
+            _save_thumbnails(img, digest, cm.THUMBNAIL_SIZES)
+        cm.write_atomic(source_path, data)  # Written last: marks the blob as complete
+    return digest
+
+def store_image(url):
+    """Download an image (or read a bundled one), store it with its thumbnails and return its content digest."""
+    _check_source(url)
+    if not _is_remote(url):
+        with open(url, 'rb') as f:
+            digest = _store_blob(url, f.read())
+        _write_url_entry(url, digest)
+        return digest
+    response = _download(url)
+    digest = _store_blob(url, response.content)
+    _write_url_entry(url, digest, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return digest
+
+def revalidate_image(url, entry):
+    """Check a stored image with its origin and return the digest of its current content.
+
+    The stored copy keeps being served while the origin is unreachable.
+    """
+    try:
+        response = _download(url, entry)
+        # On 304 the image is unchanged and only the check time is updated
+        digest = entry['digest'] if response.status_code == 304 else _store_blob(url, response.content)
+    except Exception as e:
+        logger.debug(f"Keeping the stored copy of {url}: {e}")
+        return entry['digest']
+    _write_url_entry(url, digest, response.headers.get('ETag', entry.get('etag')),
+                     response.headers.get('Last-Modified', entry.get('last_modified')))
+    return digest
+
+def get_thumbnail_path(url, size):
+    """Return the path of an image's thumbnail, downloading and storing the image if needed."""
+    _check_source(url)
+    entry = _read_url_entry(url)
+    if entry is None:
+        digest = store_image(url)
+    elif _is_remote(url) and time.time() - entry['checked_at'] > cm.IMAGE_MAX_AGE_SECONDS:
+        digest = revalidate_image(url, entry)
+    else:
+        digest = entry['digest']
+    path = _thumbnail_path(digest, size)
+    if not os.path.exists(path):
+        source_path = os.path.join(_blob_dir(digest), 'source')
+        if not os.path.exists(source_path):
+            digest = store_image(url)  # The blob was removed; fetch it again
+            source_path = os.path.join(_blob_dir(digest), 'source')
+            path = _thumbnail_path(digest, size)
+        if not os.path.exists(path):  # A size outside THUMBNAIL_SIZES
+            with Image.open(source_path) as img:
+                _save_thumbnails(img, digest, [size])
+    return path
+
+@st.cache_data(show_spinner=False, ttl=cm.IMAGE_MAX_AGE_SECONDS)
+def _load_thumbnail(url, size):
+    # Failures raise, so st.cache_data keeps only successes and a recovered URL is picked up again.
+    # Entries expire with the stored images, so a changed image is picked up after revalidation.
+    img = Image.open(get_thumbnail_path(url, size))
+    img.load()
+    return img
+
+def load_thumbnail(url, size):
+    """Return the thumbnail of an image URL as a PIL image, or the placeholder if it cannot be loaded."""
+    if not isinstance(url, str) or not url.strip():
+        url = cm.PLACEHOLDER_IMAGE
+    try:
+        return _load_thumbnail(url, size)
+    except ImageUnavailable as e:
+        logger.debug(f"Skipping image: {e}")
+    except Exception as e:
+        logger.error(f"Error loading image from {url}: {e}")
+    return _load_thumbnail(cm.PLACEHOLDER_IMAGE, size)
+
+def prefetch(func, args_list):
+    """Call the cached loader func(*args) for every distinct args concurrently and wait for all of them.
+
+    Pages call this with the images of the rows they are about to show, so the rows then render
+    from the cache and a cold page takes as long as its slowest image instead of the sum.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(args):
+        add_script_run_ctx(threading.current_thread(), ctx)  # Needed to use st.cache_data off the script thread
+        try:
+            func(*args)
+        except Exception as e:
+            logger.warning(f"Prefetching image {args[0]} failed: {e}")
+
+    wait([_fetch_pool.submit(run, args) for args in dict.fromkeys(args_list)])
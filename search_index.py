@@ -0,0 +1,140 @@
+#search_index.py
+
+import re
+import bisect
+import threading
+import unicodedata
+import pandas as pd
+import common as cm
+
+# In-memory inverted index over the tests and words tables, shared by all sessions.
+# Text is matched accent-insensitively ("pho" finds "phở", "aiti" finds "äiti") and every
+# query word matches as a word prefix, so results can be shown as the user types.
+# Indexes follow their table in the table store: when its data version changes, only the
+# rows whose indexed fields changed are re-tokenized.
+
+# prd path -> (key column, indexed columns, repository path)
+SEARCHABLE = {
+    cm.prd_TestsList_path: ('TestID', ['TestName', 'TestDescription', 'TestLanguage'], cm.TESTS_CSV_FILE_PATH),
+    cm.prd_WordsList_path: ('WordID', ['Word', 'Description'], cm.WORDS_CSV_FILE_PATH),
+}
+
+# Above this many added or removed tokens the sorted token list is rebuilt instead of patched
+_RESORT_THRESHOLD = 64
+
+def normalize(text):
+    """Lower-case text and strip its accents (đ counts as d)."""
+    text = str(text).lower().replace('đ', 'd')
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+def tokenize(text):
+    return re.findall(r'\w+', normalize(text))
+
+class SearchIndex:
+    """Inverted index from normalized tokens to row keys, with prefix lookup over the sorted tokens."""
+
+    def __init__(self, key_column, fields):
+        self.key_column = key_column
+        self.fields = fields
+        self._row_hashes = {}  # key -> hash of the row's indexed fields
+        self._row_tokens = {}  # key -> set of tokens
+        self._postings = {}  # token -> set of keys
+        self._tokens = []  # Sorted tokens, for prefix lookup with bisect
+        self._source = None  # DataFrame the index was last updated from
+        self._lock = threading.Lock()
+
+    def _add(self, key, tokens, added):
+        self._row_tokens[key] = tokens
+        for token in tokens:
+            keys = self._postings.get(token)
+            if keys is None:
+                keys = self._postings[token] = set()
+                added.add(token)
+            keys.add(key)
+
+    def _remove(self, key, removed):
+        for token in self._row_tokens.pop(key, ()):
+            keys = self._postings[token]
+            keys.discard(key)
+            if not keys:
+                del self._postings[token]
+                removed.add(token)
+
+    def _update_sorted_tokens(self, added, removed):
+        added, removed = added - removed, removed - added  # Tokens removed and re-added stay in place
+        if len(added) + len(removed) > _RESORT_THRESHOLD:
+            self._tokens = sorted(self._postings)
+            return
+        for token in removed:
+            del self._tokens[bisect.bisect_left(self._tokens, token)]
+        for token in added:
+            bisect.insort(self._tokens, token)
+
+    def update(self, df):
+        """Bring the index in line with df, re-tokenizing only rows whose indexed fields changed.
+
+        Returns the number of rows added, changed or removed.
+        """
+        with self._lock:
+            if df is self._source:
+                return 0
+            values = df[self.fields]
+            hashes = pd.util.hash_pandas_object(values.astype(str), index=False).tolist()
+            added, removed = set(), set()
+            seen = set()
+            changed = 0
+            for key, row_hash, row in zip(df[self.key_column].tolist(), hashes, values.itertuples(index=False, name=None)):
+                seen.add(key)
+                if self._row_hashes.get(key) == row_hash:
+                    continue
+                self._remove(key, removed)
+                self._add(key, set(tokenize(' '.join(str(v) for v in row if pd.notna(v)))), added)
+                self._row_hashes[key] = row_hash
+                changed += 1
+            for key in set(self._row_hashes) - seen:
+                self._remove(key, removed)
+                del self._row_hashes[key]
+                changed += 1
+            self._update_sorted_tokens(added, removed)
+            self._source = df
+            return changed
+
+    def search(self, query):
+        """Return the keys of the rows containing every word of query, each as a word prefix."""
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)  # Longest (most selective) first
+        if not terms:
+            return set()
+        with self._lock:
+            result = None
+            for term in terms:
+                matches = set()
+                i = bisect.bisect_left(self._tokens, term)
+                while i < len(self._tokens) and self._tokens[i].startswith(term):
+                    matches |= self._postings[self._tokens[i]]
+                    i += 1
+                result = matches if result is None else result & matches
+                if not result:
+                    break
+            return result
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_search_index(prd_path):
+    """Return (index, DataFrame) for a searchable table, updating the index if the table changed."""
+    key_column, fields, repo_path = SEARCHABLE[prd_path]
+    df = cm.get_storage().load_table(repo_path, prd_path)
+    with _indexes_lock:
+        index = _indexes.get(prd_path)
+        if index is None:
+            index = _indexes[prd_path] = SearchIndex(key_column, fields)
+    index.update(df)
+    return index, df
+
+def search_catalog(query):
+    """Return (tests, words) matching query; tests also match when one of their words does."""
+    tests_index, df_tests = get_search_index(cm.prd_TestsList_path)
+    words_index, df_words = get_search_index(cm.prd_WordsList_path)
+    words = df_words[df_words['WordID'].isin(words_index.search(query))]
+    test_ids = tests_index.search(query) | set(words['TestID'])
+    return df_tests[df_tests['TestID'].isin(test_ids)].copy(), words.copy()
@@ -0,0 +1,243 @@
+#storage.py
+
+import os
+import sqlite3
+import threading
+import pandas as pd
+import common as cm
+
+# Every table the app stores: prd CSV path -> (table name, key column, repository CSV path)
+TABLES = {
+    cm.prd_TestsList_path: ('TestsList', 'TestID', cm.TESTS_CSV_FILE_PATH),
+    cm.prd_WordsList_path: ('WordsList', 'WordID', cm.WORDS_CSV_FILE_PATH),
+    cm.prd_UserData_path: ('UserData', 'UserID', cm.USERDATA_CSV_FILE_PATH),
+    cm.prd_ClassData_path: ('ClassData', 'ClassID', cm.CLASSDATA_CSV_FILE_PATH),
+    cm.prd_AttemptData_path: ('AttemptData', 'AttemptID', cm.ATTEMPTDATA_CSV_FILE_PATH),
+}
+
+# Columns that get an SQLite index in every table that has them
+INDEXED_COLUMNS = ['TestID', 'WordID', 'UserID', 'AttemptID']
+
+def _key_column(prd_path):
+    return TABLES[prd_path][1]
+
+def _to_sql_value(value):
+    """Convert pandas/numpy scalars to values the sqlite3 module accepts."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+class CsvBackend:
+    """Store every table in its prd_Data CSV file (the original storage format)."""
+    name = 'csv'
+
+    def cache_key(self, prd_path):
+        return prd_path
+
+    def load_table(self, repo_path, prd_path):
+        return cm.load_csv_table(repo_path, prd_path)
+
+    def _row_mask(self, df, prd_path, row_index, key):
+        if key is not None:
+            return df[_key_column(prd_path)] == key
+        return df.index == row_index
+
+    def insert_rows(self, data, prd_path):
+        cm.append_to_csv(data, prd_path)
+        return len(pd.DataFrame(data))
+
+    def update_rows(self, new_data, prd_path, row_index=None, key=None):
+        if not os.path.exists(prd_path):
+            return 0
+        df = cm.load_csv_table(TABLES[prd_path][2], prd_path).copy()
+        mask = self._row_mask(df, prd_path, row_index, key)
+        if isinstance(new_data, dict):
+            df.loc[mask, list(new_data)] = list(new_data.values())
+        else:
+            df.loc[mask] = new_data
+        cm.write_csv_table(df, prd_path)
+        return int(mask.sum())
+
+    def delete_rows(self, prd_path, row_index=None, key=None):
+        if not os.path.exists(prd_path):
+            return 0
+        df = cm.load_csv_table(TABLES[prd_path][2], prd_path)
+        mask = self._row_mask(df, prd_path, row_index, key)
+        cm.write_csv_table(df[~mask], prd_path)
+        return int(mask.sum())
+
+    def replace_rows(self, column, value, new_df, prd_path):
+        """Replace all rows whose `column` equals `value` with the rows of new_df."""
+        df = cm.load_csv_table(TABLES[prd_path][2], prd_path)
+        df = pd.concat([df[df[column] != value], new_df], ignore_index=True)
+        cm.write_csv_table(df, prd_path)
+
+class SqliteBackend:
+    """Store every table in one SQLite database (WAL mode) with indexed, keyed row access.
+
+    Tables missing from the database are migrated from their CSV file on first use.
+    All sessions share one connection, opened once per process and used under a lock, so
+    script reruns on new threads never reopen the database or repeat its PRAGMAs.
+    """
+    name = 'sqlite'
+
+    def __init__(self, db_path=cm.prd_Database_path):
+        self.db_path = db_path
+        self._con = None
+        self._lock = threading.RLock()  # Held for every use of the shared connection
+        self._ready = set()
+
+    def _connect(self):
+        with self._lock:
+            if self._con is None:
+                con = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+                con.execute("PRAGMA journal_mode=WAL")
+                con.execute("PRAGMA synchronous=NORMAL")
+                con.execute("CREATE TABLE IF NOT EXISTS _table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+                self._con = con
+            return self._con
+
+    def _table(self, prd_path):
+        """Return (connection, table name, key column), migrating the table if needed."""
+        name, key_column, repo_path = TABLES[prd_path]
+        con = self._connect()
+        if name not in self._ready:
+            with self._lock:
+                exists = con.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+                ).fetchone()
+                if not exists:
+                    source = prd_path if os.path.exists(prd_path) else repo_path
+                    self.import_dataframe(pd.read_csv(source), prd_path)
+                self._ready.add(name)
+        return con, name, key_column
+
+    def _bump_version(self, con, name):
+        con.execute(
+            "INSERT INTO _table_versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (name,),
+        )
+
+    def _changed(self, prd_path):
+        cm.invalidate_table_cache(self.cache_key(prd_path))  # Free the stale copy now; its version no longer matches
+
+    def _version(self, con, name):
+        row = con.execute("SELECT version FROM _table_versions WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _rowid_at(self, con, name, row_index):
+        """Translate a positional row index (as in the CSV file) to an SQLite rowid."""
+        row = con.execute(
+            f'SELECT rowid FROM "{name}" ORDER BY rowid LIMIT 1 OFFSET ?', (int(row_index),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _where(self, con, name, key_column, row_index, key):
+        if key is not None:
+            return f'"{key_column}" = ?', (_to_sql_value(key),)
+        return "rowid = ?", (self._rowid_at(con, name, row_index),)
+
+    def import_dataframe(self, df, prd_path):
+        """Create (or replace) a table from a DataFrame and build its indexes."""
+        with self._lock:
+            name = TABLES[prd_path][0]
+            con = self._connect()
+            df.to_sql(name, con, if_exists='replace', index=False)
+            with con:
+                for column in INDEXED_COLUMNS:
+                    if column in df.columns:
+                        con.execute(f'CREATE INDEX IF NOT EXISTS "idx_{name}_{column}" ON "{name}" ("{column}")')
+                self._bump_version(con, name)
+            self._changed(prd_path)
+            return len(df)
+
+    def cache_key(self, prd_path):
+        return f"{self.db_path}::{TABLES[prd_path][0]}"
+
+    def load_table(self, repo_path, prd_path):
+        with self._lock:
+            con, name, _ = self._table(prd_path)
+            return cm.get_cached_table(
+                self.cache_key(prd_path),
+                self._version(con, name),
+                lambda: pd.read_sql_query(f'SELECT * FROM "{name}" ORDER BY rowid', con),
+            )
+
+    def _insert(self, con, name, new_df):
+        columns = ", ".join(f'"{col}"' for col in new_df.columns)
+        placeholders = ", ".join("?" for _ in new_df.columns)
+        rows = [[_to_sql_value(v) for v in row] for row in new_df.itertuples(index=False)]
+        con.executemany(f'INSERT INTO "{name}" ({columns}) VALUES ({placeholders})', rows)
+        return len(rows)
+
+    def insert_rows(self, data, prd_path):
+        with self._lock:
+            con, name, _ = self._table(prd_path)
+            with con:
+                count = self._insert(con, name, pd.DataFrame(data))
+                self._bump_version(con, name)
+            self._changed(prd_path)
+            return count
+
+    def update_rows(self, new_data, prd_path, row_index=None, key=None):
+        with self._lock:
+            con, name, key_column = self._table(prd_path)
+            if not isinstance(new_data, dict):
+                columns = [c[1] for c in con.execute(f'PRAGMA table_info("{name}")')]
+                new_data = dict(zip(columns, new_data))
+            assignments = ", ".join(f'"{col}" = ?' for col in new_data)
+            where, params = self._where(con, name, key_column, row_index, key)
+            with con:
+                cursor = con.execute(
+                    f'UPDATE "{name}" SET {assignments} WHERE {where}',
+                    [_to_sql_value(v) for v in new_data.values()] + list(params),
+                )
+                self._bump_version(con, name)
+            self._changed(prd_path)
+            return cursor.rowcount
+
+    def delete_rows(self, prd_path, row_index=None, key=None):
+        with self._lock:
+            con, name, key_column = self._table(prd_path)
+            where, params = self._where(con, name, key_column, row_index, key)
+            with con:
+                cursor = con.execute(f'DELETE FROM "{name}" WHERE {where}', params)
+                self._bump_version(con, name)
+            self._changed(prd_path)
+            return cursor.rowcount
+
+    def replace_rows(self, column, value, new_df, prd_path):
+        """Replace all rows whose `column` equals `value` with the rows of new_df."""
+        with self._lock:
+            con, name, _ = self._table(prd_path)
+            with con:
+                con.execute(f'DELETE FROM "{name}" WHERE "{column}" = ?', (_to_sql_value(value),))
+                self._insert(con, name, new_df)
+                self._bump_version(con, name)
+            self._changed(prd_path)
+
+def create_backend(name):
+    """Create the storage backend called `name` ('csv' or 'sqlite')."""
+    if name == 'csv':
+        return CsvBackend()
+    if name == 'sqlite':
+        return SqliteBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+def migrate_csv_to_sqlite(db_path=cm.prd_Database_path):
+    """Copy every table from its CSV file (prd_Data if present, else Data) into SQLite."""
+    backend = SqliteBackend(db_path)
+    counts = {}
+    for prd_path, (name, _, repo_path) in TABLES.items():
+        source = prd_path if os.path.exists(prd_path) else repo_path
+        counts[name] = backend.import_dataframe(pd.read_csv(source), prd_path)
+    return counts
+
+if __name__ == "__main__":
+    # One-shot migration: python storage.py
+    os.makedirs(cm.prd_Data_path, exist_ok=True)
+    for table, rows in migrate_csv_to_sqlite().items():
+        print(f"Migrated {rows} rows into {table}")